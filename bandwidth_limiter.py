@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Bandwidth Limiter - Shared token buckets for global and per-file speed caps
+Each transfer draws tokens in larger grants so the shared lock is not taken for every chunk
+"""
+
+import threading
+import time
+import weakref
+
+GRANT_SIZE = 1024 * 1024  # Largest slice of the budget a transfer reserves at once
+MIN_GRANT_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    def __init__(self, rate=0):
+        """Token bucket refilled at `rate` bytes/sec (0 = unlimited) with one second of burst"""
+        self._lock = threading.Lock()
+        self.rate = rate
+        self._tokens = float(rate)
+        self._last = time.monotonic()
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(float(self.rate), self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate):
+        """Change the rate live; outstanding debt is kept so a lowered cap applies immediately"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(0, int(rate))
+            if self.rate <= 0:
+                self._tokens = 0.0
+            else:
+                self._tokens = min(self._tokens, float(self.rate))
+
+    def reserve(self, amount):
+        """Take `amount` tokens (may go into debt); returns how long the caller must wait"""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class ThroughputMeter:
+    def __init__(self):
+        """Lock-free byte counter: each thread bumps its own slot, readers sum all slots"""
+        self._slots = {}
+
+    def add(self, amount):
+        ident = threading.get_ident()
+        self._slots[ident] = self._slots.get(ident, 0) + amount
+
+    def total(self):
+        return sum(list(self._slots.values()))
+
+
+global_bucket = TokenBucket(0)
+meter = ThroughputMeter()  # Bytes received by every transfer, used to measure goodput
+_per_file_rate = 0
+_file_buckets = weakref.WeakSet()
+_registry_lock = threading.Lock()
+
+
+def set_global_limit(rate):
+    """Cap the combined speed of every transfer (bytes/sec, 0 = unlimited)"""
+    global_bucket.set_rate(rate)
+
+
+def set_per_file_limit(rate):
+    """Cap each file's speed (bytes/sec, 0 = unlimited); applies to running downloads too"""
+    global _per_file_rate
+    with _registry_lock:
+        _per_file_rate = max(0, int(rate))
+        buckets = list(_file_buckets)
+    for bucket in buckets:
+        bucket.set_rate(_per_file_rate)
+
+
+def new_file_bucket():
+    """Per-file bucket shared by every connection (segment) of one download"""
+    with _registry_lock:
+        bucket = TokenBucket(_per_file_rate)
+        _file_buckets.add(bucket)
+    return bucket
+
+
+class Throttle:
+    def __init__(self, file_bucket=None):
+        """Per-connection view of the limits; keeps a local credit so most chunks take no lock"""
+        self.file_bucket = file_bucket
+        self._credit = 0
+
+    def is_capped(self):
+        """True while a global or per-file speed cap applies to this connection"""
+        return global_bucket.rate > 0 or bool(self.file_bucket and self.file_bucket.rate > 0)
+
+    def consume(self, amount, stop_event=None):
+        """Account for `amount` received bytes, sleeping if a cap is exceeded"""
+        meter.add(amount)
+        file_rate = self.file_bucket.rate if self.file_bucket else 0
+        global_rate = global_bucket.rate
+        if global_rate <= 0 and file_rate <= 0:
+            self._credit = 0
+            return
+
+        self._credit -= amount
+        if self._credit >= 0:
+            return
+
+        # Reserve a grant big enough to cover the deficit, but no more than ~1/10 s of the tightest cap
+        rates = [r for r in (global_rate, file_rate) if r > 0]
+        grant = max(-self._credit, min(GRANT_SIZE, max(MIN_GRANT_SIZE, min(rates) // 10)))
+        wait = global_bucket.reserve(grant)
+        if self.file_bucket:
+            wait = max(wait, self.file_bucket.reserve(grant))
+        self._credit += grant
+
+        if wait > 0:
+            if stop_event:
+                stop_event.wait(wait)
+            else:
+                time.sleep(wait)
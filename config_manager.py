@@ -240,6 +240,17 @@ def add_downloaded_url(url: str):
     
     save_url_tracking(tracking)
 
+def set_url_checksum(url: str, filename: str, size: int, digests: Dict[str, str]):
+    """Store the checksums computed while downloading a URL"""
+    tracking = get_url_tracking()
+    checksums = tracking.setdefault('checksums', {})
+    checksums[url] = {'filename': filename, 'size': size, **digests}
+    save_url_tracking(tracking)
+
+def get_url_checksum(url: str):
+    """Get stored checksums for a URL (None if it wasn't hashed)"""
+    return get_url_tracking().get('checksums', {}).get(url)
+
 def group_sequential_archives(urls: List[str], url_to_filename: Dict[str, str] = None) -> Dict[str, Dict]:
     """Group URLs by sequential archive patterns"""
     groups = {}
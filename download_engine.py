@@ -0,0 +1,864 @@
+#!/usr/bin/env python3
+"""
+Download Engine - Segmented multi-connection transfers
+Splits a file into byte ranges that are fetched in parallel into one preallocated .tmp file
+"""
+
+import errno
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from http_session import http_get, drop_connection
+from bandwidth_limiter import Throttle
+from stall_watchdog import watchdog
+
+try:
+    import xxhash  # Optional - a much faster second hash for our own integrity checks
+except ImportError:
+    xxhash = None
+
+CHUNK_SIZE = 1024 * 512  # 512 KB - starting read size, adapted per connection
+MIN_CHUNK_SIZE = 1024 * 64
+MAX_CHUNK_SIZE = 1024 * 1024 * 4
+CHUNK_TARGET_SECONDS = 0.1  # Aim for reads that take about this long at the observed speed
+MIN_SEGMENT_SIZE = 1024 * 1024 * 8  # Never split a file into segments smaller than 8 MB
+REQUEST_TIMEOUT = (20, 10)
+SEGMENT_STATE_SUFFIX = ".segments"
+CHECKPOINT_BLOCK = 1024 * 1024 * 4  # Each segment records a CRC32 per block of this size it has completed
+CHECKPOINT_INTERVAL = 5.0  # Seconds between sidecar flushes while segments are running
+CHECKPOINT_VERIFY_BLOCKS = 2  # Last blocks of each segment re-read and checked against the sidecar on resume
+DURABILITY_MODES = ("none", "periodic", "strict")
+DEFAULT_DURABILITY = "periodic"
+SYNC_EVERY_BYTES = 1024 * 1024 * 64  # 'periodic' forces written data to disk after this much...
+SYNC_EVERY_SECONDS = 5.0  # ...or this long, whichever comes first
+HASH_READ_SIZE = 1024 * 1024 * 4  # Block size when re-reading a file prefix to hash it
+LINK_EXPIRED_STATUSES = (403, 404, 410)  # What a file host answers once a download link has expired
+LINK_REFRESH_LIMIT = 2  # Times one download may swap in a freshly resolved link
+RESUME_OVERLAP = 64 * 1024  # Bytes before a resume point fetched again and compared with the .tmp
+HEDGE_TAIL_FRACTION = 0.9  # A file counts as nearly done (tail mode) from this fraction on
+HEDGE_MIN_BYTES = 1024 * 1024  # Ranges smaller than this are not worth a second connection
+HEDGE_MIN_ETA = 3.0  # Only hedge a range expected to take at least this many more seconds
+HEDGE_CHECK_INTERVAL = 1.0
+HEDGE_LIMIT = 2  # Hedged requests running at once across all downloads
+_hedge_slots = threading.BoundedSemaphore(HEDGE_LIMIT)
+
+
+def http_status(error):
+    """HTTP status code carried by a requests exception, or None"""
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+class CancelEvent(threading.Event):
+    def __init__(self):
+        """Stop flag that also shuts down the connections attached to it, so blocked reads return at once"""
+        super().__init__()
+        self._responses_lock = threading.Lock()
+        self._responses = set()
+
+    def attach(self, response):
+        with self._responses_lock:
+            self._responses.add(response)
+        if self.is_set():
+            drop_connection(response)
+
+    def detach(self, response):
+        with self._responses_lock:
+            self._responses.discard(response)
+
+    def set(self):
+        super().set()
+        with self._responses_lock:
+            responses = list(self._responses)
+        for response in responses:
+            drop_connection(response)
+
+
+def watch_response(stop_event, response):
+    """Let `stop_event` cut `response` off the moment it is set (plain Events are only polled)"""
+    if isinstance(stop_event, CancelEvent):
+        stop_event.attach(response)
+
+
+def unwatch_response(stop_event, response):
+    if isinstance(stop_event, CancelEvent):
+        stop_event.detach(response)
+
+
+def parse_content_range(content_range):
+    """Parse 'bytes start-end/total' into (start, end, total); total is None when '*'"""
+    if not content_range:
+        return None
+    m = re.match(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", content_range.strip(), flags=re.IGNORECASE)
+    if not m:
+        return None
+    total = int(m.group(3)) if m.group(3) != "*" else None
+    return int(m.group(1)), int(m.group(2)), total
+
+
+def split_ranges(total, segments):
+    """Split [0, total) into at most `segments` inclusive byte ranges of MIN_SEGMENT_SIZE or more"""
+    segments = max(1, min(segments, total // MIN_SEGMENT_SIZE or 1))
+    size = total // segments
+    ranges = []
+    for i in range(segments):
+        start = i * size
+        end = total - 1 if i == segments - 1 else start + size - 1
+        ranges.append({'start': start, 'end': end, 'pos': start, 'blocks': []})
+    return ranges
+
+
+def segment_state_path(temp_path):
+    """Sidecar that remembers per-segment progress for a segmented .tmp"""
+    return Path(str(temp_path) + SEGMENT_STATE_SUFFIX)
+
+
+def has_segment_state(temp_path):
+    """A sidecar next to an existing .tmp (one left behind by a deleted .tmp doesn't count)"""
+    return Path(temp_path).exists() and segment_state_path(temp_path).exists()
+
+
+def load_segment_state(temp_path, total):
+    """Load saved segment progress; returns None if missing or for a different file size"""
+    state_path = segment_state_path(temp_path)
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state.get('total') == total and Path(temp_path).exists():
+            return state.get('segments')
+    except Exception:
+        pass
+    return None
+
+
+def save_segment_state(temp_path, total, segments, durable=False):
+    """Save segment progress next to the .tmp; written to a side file and swapped in, so a crash
+    leaves either the old or the new state, never a torn one"""
+    state_path = segment_state_path(temp_path)
+    new_path = state_path.with_name(state_path.name + ".new")
+    try:
+        with open(new_path, 'w') as f:
+            json.dump({'total': total, 'block': CHECKPOINT_BLOCK, 'segments': segments}, f, separators=(",", ":"))
+            if durable:
+                # The new state must be on disk before it replaces the old one
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(new_path, state_path)
+    except Exception as e:
+        print(f"Failed to save segment state for {temp_path}: {e}")
+
+
+def checkpoint_pos(seg):
+    """Where a saved segment resumes: the end of its last checksummed block (its raw position when
+    the sidecar predates block checksums)"""
+    if seg.get('blocks') is None:
+        return seg['pos']
+    return min(seg['start'] + len(seg['blocks']) * CHECKPOINT_BLOCK, seg['end'] + 1)
+
+
+def resume_offset(temp_path):
+    """First byte still missing from `temp_path`: the earliest unfinished segment, or the size of an appended .tmp"""
+    temp_path = Path(temp_path)
+    if not temp_path.exists():
+        return 0
+    if has_segment_state(temp_path):
+        try:
+            with open(segment_state_path(temp_path), 'r') as f:
+                segments = json.load(f).get('segments') or []
+            pending = [checkpoint_pos(seg) for seg in segments if checkpoint_pos(seg) <= seg['end']]
+            return min(pending) if pending else 0
+        except Exception:
+            return 0
+    return temp_path.stat().st_size
+
+
+def response_span(response):
+    """(first byte, total size) of a response; total is 0 when unknown"""
+    if response.status_code == 206:
+        parsed = parse_content_range(response.headers.get("Content-Range"))
+        if parsed:
+            return parsed[0], parsed[2] or 0
+    return 0, int(response.headers.get("Content-Length", 0))
+
+
+def resume_validator(etag, last_modified):
+    """If-Range value: a strong ETag, else Last-Modified, else None"""
+    if etag and not etag.startswith("W/"):
+        return etag
+    return last_modified
+
+
+def open_from(url, offset, validator=None, end=None):
+    """One streaming GET from `offset` on; servers that ignore Range - or whose file no longer
+    matches `validator` (If-Range) - answer 200 with the whole body"""
+    # identity: byte ranges must refer to the file itself, not to a compressed rendering of it
+    headers = {"Range": f"bytes={offset}-{'' if end is None else end}", "Accept-Encoding": "identity"}
+    if validator and offset > 0:
+        headers["If-Range"] = validator
+    return http_get(url, stream=True, headers=headers, timeout=REQUEST_TIMEOUT)
+
+
+def verify_overlap(response, path, offset, overlap):
+    """Consume the first `overlap` bytes of a response that starts at `offset - overlap` and check
+    they match what the file already holds there; on True the response continues at `offset`"""
+    if overlap <= 0:
+        return True
+    encoding = response.headers.get("Content-Encoding", "identity").strip().lower()
+    if encoding not in ("", "identity"):
+        # Encoded bytes can't be compared, and the body wouldn't line up with file offsets anyway
+        return False
+    fp = getattr(response.raw, "_fp", None)
+    read = fp.read if fp is not None else response.raw.read
+    remote = b""
+    while len(remote) < overlap:
+        data = read(overlap - len(remote))
+        if not data:
+            return False
+        remote += data
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset - overlap)
+            local = f.read(overlap)
+    except OSError:
+        return False
+    return local == remote
+
+
+def clear_segment_state(temp_path):
+    state_path = segment_state_path(temp_path)
+    try:
+        state_path.unlink()
+        state_path.with_name(state_path.name + ".new").unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Failed to remove segment state for {temp_path}: {e}")
+
+
+def _raw_readinto(response):
+    """readinto() that fills a caller buffer straight from the socket, or None if the body needs decoding"""
+    encoding = response.headers.get("Content-Encoding", "identity").strip().lower()
+    if encoding not in ("", "identity"):
+        return None
+    # urllib3's own readinto() copies out of a freshly allocated bytes object;
+    # the http.client response underneath reads directly into our buffer
+    fp = getattr(response.raw, "_fp", None)
+    if fp is not None and hasattr(fp, "readinto"):
+        return fp.readinto
+    return None
+
+
+class Receiver:
+    def __init__(self, response):
+        """Receive loop over one response reusing a single preallocated buffer"""
+        self.response = response
+        self.chunk_size = CHUNK_SIZE
+        self._readinto = _raw_readinto(response)
+        self._buffer = bytearray(MAX_CHUNK_SIZE) if self._readinto else None
+
+    def chunks(self):
+        """Yield memoryviews of received data; each view is only valid until the next one is requested"""
+        if self._readinto is None:
+            # Compressed or unusual body - let requests decode it
+            for chunk in self.response.iter_content(self.chunk_size):
+                yield memoryview(chunk)
+            return
+
+        view = memoryview(self._buffer)
+        while True:
+            started = time.monotonic()
+            n = self._readinto(view[:self.chunk_size])
+            if not n:
+                break
+            self._adapt(time.monotonic() - started)
+            yield view[:n]
+
+        fp = getattr(self.response.raw, "_fp", None)
+        missing = getattr(fp, "length", None)
+        if missing:
+            # http.client returns 0 instead of raising when the connection closes before Content-Length
+            raise IOError(f"Connection closed with {missing} bytes of the response body missing")
+        # Body fully read behind urllib3's back - hand the keep-alive connection back to the pool
+        if fp is None or fp.isclosed():
+            self.response.raw.release_conn()
+
+    def _adapt(self, elapsed):
+        """Double the read size on fast links, halve it on slow ones"""
+        if elapsed < CHUNK_TARGET_SECONDS / 2 and self.chunk_size < MAX_CHUNK_SIZE:
+            self.chunk_size *= 2
+        elif elapsed > CHUNK_TARGET_SECONDS * 2 and self.chunk_size > MIN_CHUNK_SIZE:
+            self.chunk_size //= 2
+
+
+class StreamingHasher:
+    def __init__(self):
+        """MD5 (matches FitGirl's published lists) plus xxh64 when xxhash is installed, fed in file order"""
+        self._md5 = hashlib.md5()
+        self._fast = xxhash.xxh64() if xxhash else None
+        self.offset = 0  # Length of the file prefix hashed so far
+
+    def update(self, offset, data):
+        """Hash `data` written at `offset` if it extends the hashed prefix; other writes are caught up later"""
+        if offset != self.offset:
+            return False
+        self._md5.update(data)
+        if self._fast:
+            self._fast.update(data)
+        self.offset += len(data)
+        return True
+
+    def reset(self):
+        """Forget everything hashed so far (bytes already hashed were rewritten)"""
+        self.__init__()
+
+    def catch_up(self, path, upto):
+        """Hash [offset, upto) by reading it back from disk (a resumed prefix, or out-of-order segments)"""
+        if self.offset >= upto:
+            return
+        buffer = bytearray(HASH_READ_SIZE)
+        view = memoryview(buffer)
+        with open(path, 'rb') as f:
+            f.seek(self.offset)
+            while self.offset < upto:
+                n = f.readinto(view[:min(HASH_READ_SIZE, upto - self.offset)])
+                if not n:
+                    raise IOError(f"{path} ended at byte {self.offset} while hashing up to {upto}")
+                self.update(self.offset, view[:n])
+
+    def digests(self):
+        result = {'md5': self._md5.hexdigest()}
+        if self._fast:
+            result['xxh64'] = self._fast.hexdigest()
+        return result
+
+
+class FileSync:
+    def __init__(self, target, mode=DEFAULT_DURABILITY, every_bytes=SYNC_EVERY_BYTES, every_seconds=SYNC_EVERY_SECONDS):
+        """Forces a file's writes to disk per durability mode: 'none' (left to the OS), 'periodic'
+        (every `every_bytes` or `every_seconds`) or 'strict' (after every write)"""
+        self.target = target  # OS file descriptor or a file object
+        self.mode = mode if mode in DURABILITY_MODES else DEFAULT_DURABILITY
+        self.every_bytes = every_bytes
+        self.every_seconds = every_seconds
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last = time.monotonic()
+
+    def wrote(self, amount):
+        if self.mode == "strict":
+            self.sync()
+            return
+        with self._lock:
+            self._unsynced += amount
+
+    def due(self):
+        """True when 'periodic' has collected enough unsynced data or time"""
+        if self.mode != "periodic" or not self._unsynced:
+            return False
+        return self._unsynced >= self.every_bytes or time.monotonic() - self._last >= self.every_seconds
+
+    def sync(self):
+        if hasattr(self.target, "flush"):
+            self.target.flush()
+            fd = self.target.fileno()
+        else:
+            fd = self.target
+        with self._lock:
+            pending = self._unsynced
+        os.fsync(fd)
+        with self._lock:
+            # Writes that landed while fsync ran are counted towards the next sync
+            self._unsynced -= pending
+            self._last = time.monotonic()
+
+    def finish(self):
+        """Make a finished file durable before it is renamed or recorded (unless the mode is 'none')"""
+        if self.mode != "none":
+            self.sync()
+
+
+def sync_directory(path):
+    """Persist a rename inside `path` (POSIX only; Windows can't open directories for fsync)"""
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"Could not sync directory {path}: {e}")
+
+
+FSCTL_SET_SPARSE = 0x000900C4
+FALLOCATE_UNSUPPORTED = {errno.EOPNOTSUPP, getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), errno.EINVAL, errno.ENOSYS}
+
+
+def _mark_sparse(fd):
+    """Flag an open file as sparse on Windows so extending it doesn't write zeros; False if that failed"""
+    try:
+        import ctypes
+        import msvcrt
+        from ctypes import wintypes
+        returned = wintypes.DWORD()
+        return bool(ctypes.windll.kernel32.DeviceIoControl(
+            wintypes.HANDLE(msvcrt.get_osfhandle(fd)), FSCTL_SET_SPARSE, None, 0, None, 0,
+            ctypes.byref(returned), None))
+    except Exception:
+        return False
+
+
+def preallocate(fd, size):
+    """Reserve `size` bytes for an open file; returns how: "fallocate", "sparse" or "none"
+
+    posix_fallocate reserves real blocks, so a full disk fails here (ENOSPC/EDQUOT are raised)
+    instead of halfway through. Where the filesystem can't do that, the file is extended sparsely:
+    ftruncate on POSIX, and on Windows only after marking it sparse - plain ftruncate there writes
+    zeros over the whole size. Without sparse support on Windows the file just grows as segments write.
+    """
+    if size <= 0:
+        return "none"
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return "fallocate"
+        except OSError as e:
+            if e.errno not in FALLOCATE_UNSUPPORTED:
+                raise
+    if os.name == "nt" and not _mark_sparse(fd):
+        return "none"
+    os.ftruncate(fd, size)
+    return "sparse"
+
+
+class PreallocatedFile:
+    def __init__(self, path, size, create=True, durability=None):
+        """Output file of a known size that segments write into at their own offsets"""
+        self.path = Path(path)
+        self.size = size
+        self._seek_lock = None if hasattr(os, "pwrite") else threading.Lock()
+        flags = os.O_RDWR | getattr(os, "O_BINARY", 0)
+        if create:
+            flags |= os.O_CREAT | os.O_TRUNC
+        self.fd = os.open(self.path, flags, 0o644)
+        self.allocation = None  # How preallocate() reserved the size (None when reopening)
+        if create:
+            try:
+                self.allocation = preallocate(self.fd, size)
+            except OSError:
+                os.close(self.fd)
+                raise
+        self.sync = FileSync(self.fd, **(durability or {}))
+
+    def write_at(self, offset, data):
+        """Positioned write of the whole buffer; no shared file position between segments"""
+        view = memoryview(data)
+        while view:
+            if self._seek_lock is None:
+                written = os.pwrite(self.fd, view, offset)
+            else:
+                # Windows has no pwrite - serialise seek+write pairs instead
+                with self._seek_lock:
+                    os.lseek(self.fd, offset, os.SEEK_SET)
+                    written = os.write(self.fd, view)
+            view = view[written:]
+            offset += written
+        self.sync.wrote(len(data))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SegmentedDownload:
+    def __init__(self, url, temp_path, total, segments, stop_event, on_progress=None, file_bucket=None,
+                 hasher=None, refresh_url=None, validator=None, durability=None, spare_connection=None):
+        """Download `url` into `temp_path` using up to `segments` parallel ranged requests"""
+        self.url = url
+        self.refresh_url = refresh_url  # Returns a freshly resolved link when `url` expires mid-download
+        self.validator = validator  # ETag / Last-Modified sent as If-Range when resuming segments
+        self._refreshes = 0
+        self.temp_path = Path(temp_path)
+        self.total = total
+        self.stop_event = stop_event
+        self.on_progress = on_progress
+        self.file_bucket = file_bucket  # Per-file speed cap shared by all segments
+        self.hasher = hasher  # Fed with whatever extends the hashed prefix; caller catches up the rest
+        self.spare_connection = spare_connection  # Returns False while the host has no connection to spare
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._abort = threading.Event()  # Set when any segment fails so the others stop too
+        self._errors = []
+        self.recycles = 0  # Stalled connections the watchdog replaced
+        self.tail = False  # Set by the caller when this file is among the last of its run
+        self.hedges = 0  # Duplicate requests started for slow tail ranges
+        self.hedges_won = 0  # ...and how many of them finished before the original connection
+        self._lanes = {}  # {segment start: set of lanes currently fetching that segment}
+        self._hedged = set()  # Segment starts that already got a hedge
+        self._seg_rates = {}  # {segment start: smoothed bytes/sec}
+        self._seg_marks = {}  # {segment start: position at the last hedge check}
+        self._block_crc = {}  # {segment start: running CRC32 of the block being filled}
+        self._discarded = False  # Set when the download is removed - its state must not be saved again
+
+        saved = load_segment_state(self.temp_path, total)
+        self.resumed = bool(saved)
+        if saved:
+            self.segments = saved
+            self.writer = PreallocatedFile(self.temp_path, total, create=False, durability=durability)
+            self._verify_checkpoint()
+            print(f"Resuming {len(saved)} segments for {self.temp_path.name}")
+        else:
+            self.segments = split_ranges(total, segments)
+            # Reserve the full size up front so every segment can write at its own offset, and
+            # record the plan right away so a full-size .tmp is never mistaken for a finished append
+            self.writer = PreallocatedFile(self.temp_path, total, create=True, durability=durability)
+            save_segment_state(self.temp_path, total, self.segments, durable=self.writer.sync.mode != "none")
+
+        self.downloaded = sum(seg['pos'] - seg['start'] for seg in self.segments)
+
+    def _verify_checkpoint(self):
+        """Roll every saved segment back to its last block whose bytes on disk still match the sidecar"""
+        with open(self.temp_path, 'rb') as f:
+            for seg in self.segments:
+                seg['pos'] = checkpoint_pos(seg)
+                blocks = seg.get('blocks')
+                if not blocks:
+                    continue
+                for i in range(max(0, len(blocks) - CHECKPOINT_VERIFY_BLOCKS), len(blocks)):
+                    block_start = seg['start'] + i * CHECKPOINT_BLOCK
+                    size = min(CHECKPOINT_BLOCK, seg['end'] + 1 - block_start)
+                    f.seek(block_start)
+                    if f"{zlib.crc32(f.read(size)):08x}" != blocks[i]:
+                        print(f"Block at byte {block_start} of {self.temp_path.name} is corrupt - refetching "
+                              f"segment {seg['start']}-{seg['end']} from there")
+                        del blocks[i:]
+                        seg['pos'] = block_start
+                        break
+
+    def _checksum(self, seg, data):
+        """Feed newly covered bytes (starting at seg['pos']) into the segment's block CRCs"""
+        blocks = seg.get('blocks')
+        if blocks is None:
+            return
+        crc = self._block_crc.get(seg['start'], 0)
+        offset = seg['pos']
+        view = memoryview(data)
+        while view:
+            block_end = min(seg['start'] + (len(blocks) + 1) * CHECKPOINT_BLOCK, seg['end'] + 1)
+            part = view[:block_end - offset]
+            crc = zlib.crc32(part, crc)
+            offset += len(part)
+            view = view[len(part):]
+            if offset == block_end:
+                blocks.append(f"{crc:08x}")
+                crc = 0
+        self._block_crc[seg['start']] = crc
+
+    def discard(self):
+        """The download was removed: stop saving progress, its .tmp is about to be deleted"""
+        self._discarded = True
+
+    def _checkpoint(self):
+        """Flush a snapshot of segment progress to the sidecar, recording only what the durability
+        mode has put on disk: 'periodic' syncs the .tmp first, 'strict' writes are synced already"""
+        if self._discarded or not self.temp_path.exists():
+            return
+        with self._lock:
+            snapshot = [dict(seg, blocks=None if seg.get('blocks') is None else list(seg['blocks']))
+                        for seg in self.segments]
+        # Every byte below a snapshot position was written before the snapshot was taken
+        sync = self.writer.sync
+        if sync.mode == "periodic":
+            sync.sync()
+        save_segment_state(self.temp_path, self.total, snapshot, durable=sync.mode != "none")
+
+    def _checkpoint_due(self, last_checkpoint):
+        if self.writer.sync.mode == "periodic":
+            return self.writer.sync.due()
+        return time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL
+
+    def is_complete(self):
+        return all(seg['pos'] > seg['end'] for seg in self.segments)
+
+    def connections(self):
+        """Connections currently open for this file (segments plus hedges)"""
+        with self._lock:
+            return sum(len(lanes) for lanes in self._lanes.values())
+
+    def run(self, first_response=None, first_offset=0, first_end=None):
+        """Fetch all unfinished segments; returns True when complete, False when stopped
+
+        `first_response` is an already-open response covering bytes `first_offset`..`first_end`
+        (None = to the end of the file); it is used for the segment resuming at that offset,
+        if it covers the whole segment, instead of opening another connection.
+        """
+        threads = []
+        try:
+            for seg in self.segments:
+                if seg['pos'] > seg['end']:
+                    continue
+                response = None
+                if (first_response is not None and seg['pos'] == first_offset
+                        and (first_end is None or first_end >= seg['end'])):
+                    response, first_response = first_response, None
+                self._lanes[seg['start']] = set()
+                thread = threading.Thread(target=self._segment_worker, args=(seg, response), daemon=True)
+                thread.start()
+                threads.append(thread)
+            if first_response is not None:
+                # No segment resumes where the response starts (e.g. a checkpoint was rolled back) -
+                # don't keep an unread connection out of the pool for the whole download
+                first_response.close()
+                first_response = None
+
+            print(f"Segmented download: {len(threads)} active segments for {self.temp_path.name}")
+            last_checkpoint = time.monotonic()
+            while True:
+                alive = [thread for thread in threads if thread.is_alive()]
+                if not alive:
+                    break
+                alive[0].join(HEDGE_CHECK_INTERVAL)
+                hedge = self._maybe_hedge()
+                if hedge:
+                    threads.append(hedge)
+                if self._checkpoint_due(last_checkpoint):
+                    self._checkpoint()
+                    last_checkpoint = time.monotonic()
+        finally:
+            if first_response is not None:
+                # Dispatch failed before the response was handed over or closed
+                first_response.close()
+            try:
+                if self.is_complete():
+                    self.writer.sync.finish()
+                else:
+                    self._checkpoint()
+            finally:
+                self.writer.close()
+
+        if self.is_complete():
+            clear_segment_state(self.temp_path)
+            return True
+
+        if self._errors:
+            raise self._errors[0]
+        return False
+
+    def _should_stop(self):
+        return self.stop_event.is_set() or self._abort.is_set()
+
+    def _open_segment(self, seg, start):
+        url = self.url
+        r = open_from(url, start, self.validator, seg['end'])
+        if r.status_code in LINK_EXPIRED_STATUSES and self._refresh_link(url):
+            # The link expired while other segments were running - continue on the new one
+            r.close()
+            r = open_from(self.url, start, self.validator, seg['end'])
+        r.raise_for_status()
+        if r.status_code != 206:
+            r.close()
+            if self.validator and start > 0:
+                raise IOError(f"Remote file changed (If-Range failed) - {self.temp_path.name} must restart")
+            raise IOError(f"Server ignored Range for segment {seg['start']}-{seg['end']}")
+        return r
+
+    def _open_resumed_segment(self, seg):
+        """Open a segment continued from an earlier session, re-checking the bytes just before its position
+
+        A torn write or a changed remote file shows up as a mismatch; the segment then starts over.
+        """
+        overlap = min(RESUME_OVERLAP, seg['pos'] - seg['start'])
+        r = self._open_segment(seg, seg['pos'] - overlap)
+        start = (parse_content_range(r.headers.get("Content-Range")) or (None,))[0]
+        if start == seg['pos'] - overlap and verify_overlap(r, self.temp_path, seg['pos'], overlap):
+            return r
+        r.close()
+        print(f"Segment {seg['start']}-{seg['end']}: data before byte {seg['pos']} doesn't match the server "
+              f"- refetching the segment")
+        with self._lock:
+            self.downloaded -= seg['pos'] - seg['start']
+            seg['pos'] = seg['start']
+            if seg.get('blocks') is not None:
+                seg['blocks'] = []
+            self._block_crc[seg['start']] = 0
+            if self.hasher and self.hasher.offset > seg['start']:
+                # The hashed prefix reaches into the bytes being refetched
+                self.hasher.reset()
+        return self._open_segment(seg, seg['pos'])
+
+    def _refresh_link(self, expired_url):
+        """Swap in a freshly resolved link once for all segments; False if that isn't possible"""
+        if not self.refresh_url:
+            return False
+        with self._refresh_lock:
+            if self.url != expired_url:
+                return True  # Another segment already refreshed it
+            if self._refreshes >= LINK_REFRESH_LIMIT or self._should_stop():
+                return False
+            self._refreshes += 1
+            print(f"Download link expired for {self.temp_path.name} - resolving a new one")
+            try:
+                new_url = self.refresh_url()
+            except Exception as e:
+                print(f"Could not refresh download link: {e}")
+                return False
+            if not new_url:
+                return False
+            self.url = new_url
+            return True
+
+    def _segment_worker(self, seg, response=None, hedge=False):
+        throttle = Throttle(self.file_bucket)
+        name = f"{self.temp_path.name} [{seg['start']}-{seg['end']}]" + (" hedge" if hedge else "")
+        lane = watchdog.register(name, throttle.is_capped)
+        with self._lock:
+            self._lanes[seg['start']].add(lane)
+        # Segments picked up from a saved state are verified on their first connection
+        verify = self.resumed and not hedge and response is None and seg['pos'] > seg['start']
+        try:
+            while True:
+                if verify:
+                    r = self._open_resumed_segment(seg)
+                    verify = False
+                else:
+                    r = response or self._open_segment(seg, seg['pos'])
+                cursor = seg['pos']
+                response = None
+                lane.attach(r)
+                watch_response(self.stop_event, r)
+                try:
+                    self._receive(seg, r, cursor, throttle, lane, hedge)
+                except Exception:
+                    if not lane.reason and seg['pos'] <= seg['end'] and not self._should_stop():
+                        raise
+                finally:
+                    unwatch_response(self.stop_event, r)
+                reason = lane.take_recycle()
+                if reason and not self._should_stop() and seg['pos'] <= seg['end']:
+                    # The watchdog dropped a stalled connection - carry on from here on a fresh one
+                    with self._lock:
+                        self.recycles += 1
+                    print(f"Segment {seg['start']}-{seg['end']} recycled ({reason}), resuming at byte {seg['pos']}")
+                    continue
+                break
+
+            if not self._should_stop() and seg['pos'] <= seg['end']:
+                raise IOError(f"Connection closed at byte {seg['pos']} of segment {seg['start']}-{seg['end']}")
+        except Exception as e:
+            with self._lock:
+                others = self._lanes[seg['start']] - {lane}
+                if not others:
+                    self._errors.append(e)
+            print(f"Segment {seg['start']}-{seg['end']}{' hedge' if hedge else ''} failed: {e}"
+                  + (" - the other connection carries on" if others else ""))
+            if not others:
+                self._abort.set()
+                self._drop_all()
+        finally:
+            watchdog.unregister(lane)
+            with self._lock:
+                self._lanes[seg['start']].discard(lane)
+
+    def _drop_all(self):
+        """Cut every connection of this download (one segment failed, the rest can't finish it)"""
+        with self._lock:
+            lanes = [lane for lanes in self._lanes.values() for lane in lanes]
+        for lane in lanes:
+            if lane.response is not None:
+                drop_connection(lane.response)
+
+    def _hedge_worker(self, seg):
+        try:
+            self._segment_worker(seg, hedge=True)
+        finally:
+            _hedge_slots.release()
+
+    def _maybe_hedge(self):
+        """In tail mode, start a duplicate request for the remaining range expected to finish last"""
+        candidates = []
+        with self._lock:
+            for seg in self.segments:
+                key = seg['start']
+                if seg['pos'] > seg['end'] or key not in self._lanes:
+                    continue
+                # Smoothed per-segment speed from how far it moved since the previous check
+                moved = seg['pos'] - self._seg_marks.get(key, seg['pos'])
+                self._seg_marks[key] = seg['pos']
+                rate = moved / HEDGE_CHECK_INTERVAL
+                previous = self._seg_rates.get(key)
+                self._seg_rates[key] = rate if previous is None else 0.5 * previous + 0.5 * rate
+                if key in self._hedged or len(self._lanes[key]) != 1:
+                    continue
+                remaining = seg['end'] + 1 - seg['pos']
+                eta = remaining / self._seg_rates[key] if self._seg_rates[key] > 0 else float("inf")
+                if previous is not None and remaining >= HEDGE_MIN_BYTES and eta >= HEDGE_MIN_ETA:
+                    candidates.append((eta, seg))
+            nearly_done = self.tail or self.downloaded >= HEDGE_TAIL_FRACTION * self.total
+
+        if not candidates or not nearly_done or self._should_stop():
+            return None
+        if self.spare_connection and not self.spare_connection():
+            return None
+        eta, seg = max(candidates, key=lambda c: c[0])
+        if not _hedge_slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._hedged.add(seg['start'])
+            self.hedges += 1
+        print(f"Hedging {self.temp_path.name} range {seg['pos']}-{seg['end']} "
+              f"(~{min(eta, 9999):.0f}s left on its connection)")
+        thread = threading.Thread(target=self._hedge_worker, args=(seg,), daemon=True)
+        thread.start()
+        return thread
+
+    def _receive(self, seg, r, cursor, throttle, lane, hedge=False):
+        """Write one response into the segment from `cursor` on; returns the cursor after the last write
+
+        Two connections may fetch the same segment (a hedge); both write the same bytes and
+        seg['pos'] is the furthest either has reached, so only newly covered bytes are counted.
+        The connection whose write completes the segment wins and cuts the other one.
+        """
+        with r:
+            for chunk in Receiver(r).chunks():
+                if self._should_stop() or seg['pos'] > seg['end']:
+                    break
+                remaining = seg['end'] + 1 - cursor
+                if len(chunk) > remaining:
+                    chunk = chunk[:remaining]
+                self.writer.write_at(cursor, chunk)
+                cursor += len(chunk)
+                losers = []
+                with self._lock:
+                    gained = cursor - seg['pos']
+                    if gained > 0:
+                        if self.hasher:
+                            self.hasher.update(seg['pos'], chunk[len(chunk) - gained:])
+                        self._checksum(seg, chunk[len(chunk) - gained:])
+                        seg['pos'] = cursor
+                        self.downloaded += gained
+                        if cursor > seg['end']:
+                            losers = list(self._lanes[seg['start']] - {lane})
+                            if hedge and losers:
+                                self.hedges_won += 1
+                    downloaded = self.downloaded
+                for other in losers:
+                    # This connection finished the range first - cancel the duplicate still running
+                    print(f"{'Hedge' if hedge else 'Original connection'} finished {seg['start']}-{seg['end']} "
+                          f"first, cancelling the other")
+                    if other.response is not None:
+                        drop_connection(other.response)
+                lane.add(len(chunk))
+                if gained > 0 and self.on_progress:
+                    self.on_progress(downloaded, self.total)
+                if cursor > seg['end']:
+                    break
+                throttle.consume(len(chunk), self.stop_event)
+        return cursor
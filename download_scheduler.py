@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Download Scheduler - Sliding-window worker pool
+Starts the next pending URL as soon as any slot frees up instead of waiting for a whole batch
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+from itertools import islice
+from urllib.parse import urlparse
+
+ADAPTIVE_INTERVAL = 5.0  # Seconds between goodput measurements
+ADAPTIVE_MIN_GAIN = 0.05  # An extra download must add at least 5% goodput to be kept
+ADAPTIVE_DROP = 0.25  # Goodput falling by 25% or more triggers a multiplicative decrease
+ADAPTIVE_DECREASE = 0.75
+ADAPTIVE_HOLD_TICKS = 6  # After hitting a plateau, wait this many ticks before probing upwards again
+ADAPTIVE_MAX_WORKERS = 16
+HOST_CONNECTION_LIMIT = 16  # Max simultaneous connections (downloads x segments) to one host
+HOST_RECHECK_INTERVAL = 1.0  # Seconds between checks while a host is at its connection limit
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+class DownloadScheduler:
+    def __init__(self, worker, max_workers=10, on_change=None, max_per_host=None, connections=None):
+        """Run `worker(url)` for every queued URL with at most `max_workers` running at once"""
+        self.worker = worker
+        self.max_workers = max(1, int(max_workers))
+        self.max_per_host = max_per_host  # Optional cap on simultaneous connections to one host
+        self.connections = connections  # Callable: connections a running URL holds (default 1 each)
+        self.on_change = on_change  # Called with get_stats() whenever a worker starts or finishes
+
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._pending_set = set()  # Same URLs as _pending, for O(1) membership checks
+        self._active = {}  # {url: thread}
+        self._delayed = []  # Heap of (due monotonic time, url) waiting for a retry
+        self._stopped = False
+        self._completed = 0
+
+    def submit(self, urls):
+        """Queue URLs in order; duplicates already queued or running are ignored"""
+        with self._cond:
+            for url in urls:
+                if url not in self._active and url not in self._pending_set:
+                    self._pending.append(url)
+                    self._pending_set.add(url)
+            self._cond.notify_all()
+
+    def submit_later(self, url, delay):
+        """Queue a URL again after `delay` seconds (retries); keeps run() alive until it is due"""
+        with self._cond:
+            if self._stopped:
+                return
+            heapq.heappush(self._delayed, (time.monotonic() + delay, url))
+            self._cond.notify_all()
+
+    def set_max_workers(self, max_workers):
+        """Change the window size; extra slots are filled right away, excess workers drain naturally"""
+        with self._cond:
+            self.max_workers = max(1, int(max_workers))
+            self._cond.notify_all()
+
+    def stop(self):
+        """Stop dispatching; running workers are expected to exit via their own stop events"""
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            self._pending_set.clear()
+            self._delayed.clear()
+            self._cond.notify_all()
+
+    def is_stopped(self):
+        return self._stopped
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'queued': len(self._pending),
+                'waiting': len(self._delayed),
+                'active': len(self._active),
+                'completed': self._completed,
+                'max_workers': self.max_workers,
+            }
+
+    def peek(self, count):
+        """The next `count` queued URLs, in dispatch order"""
+        with self._cond:
+            return list(islice(self._pending, count))
+
+    def _promote_due(self):
+        """Move retries whose delay has passed to the front of the queue; seconds until the next one"""
+        now = time.monotonic()
+        held = []
+        while self._delayed and self._delayed[0][0] <= now:
+            due, url = heapq.heappop(self._delayed)
+            if url in self._active:
+                held.append((due, url))  # Its failed attempt is still unwinding
+            elif url not in self._pending_set:
+                self._pending.appendleft(url)
+                self._pending_set.add(url)
+        for entry in held:
+            heapq.heappush(self._delayed, entry)
+        if held:
+            return None  # Woken again when that worker finishes
+        return max(0.0, self._delayed[0][0] - now) if self._delayed else None
+
+    def spare_connections(self, url):
+        """Connections the host of `url` can still take under max_per_host, or None without a cap"""
+        if not self.max_per_host:
+            return None
+        host = host_of(url)
+        with self._cond:
+            used = sum(count for other, count in self._connections_by_url().items() if host_of(other) == host)
+        return max(0, self.max_per_host - used)
+
+    def _connections_by_url(self):
+        """{url: connections} for running workers; one that hasn't opened any yet counts as one"""
+        counts = {}
+        for url in self._active:
+            count = 1
+            if self.connections:
+                try:
+                    count = max(1, int(self.connections(url)))
+                except Exception as e:
+                    print(f"Scheduler connection count failed for {url}: {e}")
+            counts[url] = count
+        return counts
+
+    def _next_url(self):
+        """Pop the first pending URL whose host still has a free connection"""
+        if not self.max_per_host:
+            url = self._pending.popleft()
+            self._pending_set.discard(url)
+            return url
+        per_host = {}
+        for url, count in self._connections_by_url().items():
+            host = host_of(url)
+            per_host[host] = per_host.get(host, 0) + count
+        for url in self._pending:
+            if per_host.get(host_of(url), 0) < self.max_per_host:
+                self._pending.remove(url)
+                self._pending_set.discard(url)
+                return url
+        return None
+
+    def run(self):
+        """Dispatch until the queue is empty and every worker has finished (or stop() is called)"""
+        while True:
+            started = []
+            with self._cond:
+                wait = self._promote_due()
+                while not self._stopped and self._pending and len(self._active) < self.max_workers:
+                    url = self._next_url()
+                    if url is None:
+                        # Hosts are at their connection limit; segments finishing free slots without
+                        # a notify, so look again shortly
+                        wait = HOST_RECHECK_INTERVAL if wait is None else min(wait, HOST_RECHECK_INTERVAL)
+                        break
+                    thread = threading.Thread(target=self._run_worker, args=(url,), daemon=True)
+                    self._active[url] = thread
+                    started.append(thread)
+
+                if not started:
+                    if self._stopped or (not self._pending and not self._active and not self._delayed):
+                        break
+                    # Sleep until a worker finishes, new URLs arrive, the window grows or a retry is due
+                    self._cond.wait(wait)
+                    continue
+
+            for thread in started:
+                thread.start()
+            self._notify_change()
+
+        # Let workers that are still running after stop() wind down before returning
+        with self._cond:
+            active = list(self._active.values())
+        for thread in active:
+            thread.join()
+
+    def _run_worker(self, url):
+        try:
+            self.worker(url)
+        except Exception as e:
+            print(f"Scheduler worker failed for {url}: {e}")
+        finally:
+            with self._cond:
+                self._active.pop(url, None)
+                self._completed += 1
+                self._cond.notify_all()
+            self._notify_change()
+
+    def _notify_change(self):
+        if self.on_change:
+            try:
+                self.on_change(self.get_stats())
+            except Exception as e:
+                print(f"Scheduler on_change error: {e}")
+
+
+class AdaptiveConcurrency:
+    def __init__(self, scheduler, read_bytes, max_segments=1, max_workers=ADAPTIVE_MAX_WORKERS,
+                 host_connection_limit=HOST_CONNECTION_LIMIT, on_change=None):
+        """AIMD controller that grows the scheduler window until extra downloads stop adding goodput"""
+        self.scheduler = scheduler
+        self.read_bytes = read_bytes  # Callable returning the total bytes received so far
+        self.max_segments = max(1, max_segments)
+        self.host_connection_limit = host_connection_limit
+        self.max_workers = max(1, min(max_workers, host_connection_limit))
+        self.on_change = on_change
+
+        self.window = max(1, min(scheduler.max_workers, self.max_workers))
+        self.goodput = 0.0
+        self._last_goodput = None
+        self._last_action = None
+        self._hold = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self.scheduler.set_max_workers(self.window)
+
+    @property
+    def segments_per_file(self):
+        """Segments for newly started files, shrunk so window x segments stays under the host limit"""
+        return max(1, min(self.max_segments, self.host_connection_limit // self.window))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        last_bytes = self.read_bytes()
+        last_ts = time.monotonic()
+        while not self._stop.wait(ADAPTIVE_INTERVAL):
+            if self.scheduler.is_stopped():
+                break
+            now_bytes = self.read_bytes()
+            now_ts = time.monotonic()
+            self.goodput = (now_bytes - last_bytes) / max(now_ts - last_ts, 1e-6)
+            last_bytes, last_ts = now_bytes, now_ts
+            self._tick(self.scheduler.get_stats())
+
+    def _tick(self, stats):
+        goodput = self.goodput
+        previous = self._last_goodput
+        window = self.window
+
+        if previous is not None and previous > 0:
+            if self._last_action == "increase" and goodput < previous * (1 + ADAPTIVE_MIN_GAIN):
+                # The last extra download bought nothing - step back and sit on the plateau for a while
+                window -= 1
+                self._hold = ADAPTIVE_HOLD_TICKS
+            elif stats['active'] >= window and goodput < previous * (1 - ADAPTIVE_DROP):
+                # Same number of downloads but much less goodput - the host or link is congested
+                window = int(window * ADAPTIVE_DECREASE)
+                self._hold = ADAPTIVE_HOLD_TICKS // 2
+
+        self._last_action = None
+        saturated = stats['active'] >= window and stats['queued'] > 0
+        if self._hold > 0:
+            self._hold -= 1
+        elif saturated and window < self.max_workers:
+            window += 1
+            self._last_action = "increase"
+
+        window = max(1, min(window, self.max_workers))
+        self._last_goodput = goodput
+        if window != self.window:
+            previous_window, self.window = self.window, window
+            print(f"Adaptive concurrency: {previous_window} -> {window} downloads "
+                  f"({goodput / 1024 / 1024:.2f} MB/s, {self.segments_per_file} segments/file)")
+            self.scheduler.set_max_workers(window)
+        if self.on_change:
+            self.on_change(self.scheduler.get_stats())
@@ -1,5 +1,4 @@
 import threading
-import requests
 import psutil
 import time
 import tkinter as tk
@@ -9,16 +8,46 @@ from bs4 import BeautifulSoup
 from urllib.parse import urljoin, unquote
 import webbrowser
 import os
+import multiprocessing
+import shutil
 import re
 from tkinter import font as tkfont
 from extractor_tab import ExtractorTab
 from donate_window import create_donate_window
 from extractor_utils import get_available_extractors, load_config
-from config_manager import get_setting, set_setting, add_imported_urls, add_downloaded_url
+from config_manager import (get_setting, set_setting, add_imported_urls, add_downloaded_url, set_url_checksum,
+                            get_url_checksum)
 from download_auto_resume import DownloadAutoResume
+from http_session import http_get, configure_pool, close_session, get_pool_stats
+from download_scheduler import DownloadScheduler, AdaptiveConcurrency, HOST_CONNECTION_LIMIT
+from bandwidth_limiter import Throttle, new_file_bucket, set_global_limit, set_per_file_limit, meter
+from download_engine import (Receiver, SegmentedDownload, has_segment_state, clear_segment_state,
+                             resume_offset, response_span, open_from, StreamingHasher, http_status,
+                             parse_content_range, split_ranges,
+                             CancelEvent, watch_response, unwatch_response, resume_validator,
+                             verify_overlap, RESUME_OVERLAP, FileSync, sync_directory,
+                             DURABILITY_MODES, DEFAULT_DURABILITY, SYNC_EVERY_BYTES, SYNC_EVERY_SECONDS,
+                             MIN_SEGMENT_SIZE, LINK_EXPIRED_STATUSES, LINK_REFRESH_LIMIT)
+from progress_aggregator import ProgressAggregator
+from metadata_cache import metadata_cache, resolved_link_cache
+from link_resolver import LinkResolver, page_parser, TITLE_PATTERN
+from retry_policy import RetryTracker, PERMANENT_CLASSES
+from stall_watchdog import watchdog
 from github_notifications_simple import GitHubNotificationSystem
 
-CHUNK_SIZE = 1024 * 512  # 512 KB
+PROGRESS_TICK_MS = 100  # Download list refresh interval (~10 Hz)
+PROGRESS_BAR_CELLS = 20  # Width of the text progress bar drawn in the download list
+LINK_PREFETCH_AHEAD = 3  # Queued page URLs kept resolved ahead of the scheduler (setting: link_prefetch_ahead)
+LINK_MAX_AGE_MINUTES = 30  # Older resolved links are re-resolved before use (setting: link_max_age_minutes)
+SHUTDOWN_TIMEOUT = 5.0  # Seconds to let cancelled downloads save their .tmp state before exiting
+STATUS_ICONS = {
+    "completed": "✅",
+    "downloading": "⬇️",
+    "paused": "⏸️",
+    "error": "❌",
+    "pending": "⏳",
+    "retrying": "🔁",
+}
 
 # Embedded QR code images as base64 strings
 EMBEDDED_IMAGES = {
@@ -63,13 +92,30 @@ def is_direct_download_url(url):
     return any(indicator in url.lower() for indicator in direct_indicators)
 
 
+def needs_resolution(url):
+    """True for fuckingfast file pages, whose /dl/ link has to be resolved (and can expire)"""
+    return "fuckingfast.co" in url and "/dl/" not in url
+
+
 def extract_download_link(page_url):
     # If it's already a direct download link, return as-is
     if is_direct_download_url(page_url):
         return page_url
 
+    cached = resolved_link_cache.get(page_url)
+    if cached:
+        print(f"Using cached download link for {page_url}")
+        return cached['link']
+
+    link = _scrape_download_link(page_url)
+    if link != page_url:
+        resolved_link_cache.record(page_url, link=link)
+    return link
+
+
+def _scrape_download_link(page_url):
     try:
-        r = requests.get(page_url, timeout=30)
+        r = http_get(page_url, timeout=30)
         r.raise_for_status()
         soup = BeautifulSoup(r.text, "html.parser")
 
@@ -287,6 +333,12 @@ class DownloaderGUI:
         self.download_dir_var = tk.StringVar(value=str(self.download_dir.resolve()))
         self.download_mode = tk.StringVar(value="batch")
         self.batch_size = tk.StringVar(value="10")
+        self.segments_per_file = tk.StringVar(value="1")  # Parallel connections per file (1 = single stream)
+        self.adaptive_concurrency = tk.BooleanVar(value=False)  # Let measured goodput pick batch size/segments
+        self.speed_limit_kbps = tk.StringVar(value="0")  # Global speed cap in KB/s (0 = unlimited)
+        self.file_speed_limit_kbps = tk.StringVar(value="0")  # Per-file speed cap in KB/s (0 = unlimited)
+        # How often written data is forced to disk: none / periodic / strict
+        self.durability_mode = tk.StringVar(value=get_setting("durability_mode", DEFAULT_DURABILITY))
         self.fitgirl_base_var = tk.StringVar(value="")
         self.current_downloads = []
         
@@ -304,6 +356,12 @@ class DownloaderGUI:
         self._net_last_ts = None
         self._net_monitor_running = False
         self._run_id = 0
+        self.scheduler = None  # Active sliding-window scheduler for the current run
+        self.progress_aggregator = ProgressAggregator()  # Worker progress, rendered by a 10 Hz UI tick
+        self.adaptive = None  # Adaptive concurrency controller while an adaptive run is active
+        self.link_resolver = LinkResolver(self.extract_real_download_link)  # Parallel page -> /dl/ resolution
+        self.retry_tracker = RetryTracker()  # Failure class, retry count and next attempt per URL
+        self.active_transfers = {}  # {page_url: SegmentedDownload} currently running
 
         self.browser_frame = None
         self.browser = None
@@ -329,7 +387,7 @@ class DownloaderGUI:
             url = "https://" + url
 
         try:
-            r = requests.get(url, timeout=30)
+            r = http_get(url, timeout=30)
             r.raise_for_status()
             html = r.text
             links = self.extract_links_from_page(html)
@@ -366,31 +424,11 @@ class DownloaderGUI:
         selected = dialog.get_selected()
         if not selected:
             return
-        # Start background thread to resolve links
-        self.set_status("Resolving selected links...")
-        threading.Thread(target=self._resolve_and_add_links, args=(selected, len(links)), daemon=True).start()
-
-    def _resolve_and_add_links(self, selected, total_available):
-        """Resolve each selected link to real /dl/ link in background thread"""
-        resolved_links = []
-        total = len(selected)
-        
-        print(f"DEBUG: Resolving {len(selected)} selected links out of {total_available} total available")
-        
-        for i, (text, href) in enumerate(selected):
-            try:
-                self.set_status(f"Resolving link {i+1}/{total}: {text[:50]}...")
-                real_dl = self.extract_real_download_link(href)
-                if real_dl:
-                    resolved_links.append((text, real_dl))
-            except Exception as e:
-                print(f"Failed to resolve {href}: {e}")
-
-        # Update UI in main thread
-        self.root.after(0, lambda: self._add_resolved_links(resolved_links, total_available))
-        
-        # Reset status back to normal after resolution completes
-        self.root.after(100, lambda: self.set_status("Ready"))
+        # Pages go into the list as-is; their /dl/ links are resolved just in time by the
+        # download stage, with the first few prefetched so the first download starts quickly
+        print(f"DEBUG: Adding {len(selected)} selected links out of {len(links)} total available")
+        self.prefetch_links([href for _, href in selected[:self._link_prefetch_ahead()]])
+        self._add_page_links(selected, len(links))
 
     def confirm_and_clear_json(self):
         """Ask user confirmation before clearing JSON data for new session"""
@@ -473,50 +511,51 @@ class DownloaderGUI:
             print(f"Error in confirm_and_clear_json: {e}")
             return True  # Continue anyway if there's an error
 
-    def _add_resolved_links(self, resolved_links, total_available):
-        """Add resolved links to the download list"""
+    def _add_page_links(self, page_links, total_available):
+        """Add selected FitGirl page links to the download list"""
         added = 0
         new_urls = []
         url_to_filename = {}
+        links_before = len(self.links)
+        
+        # Load tracking once for the whole batch instead of once per link
+        from config_manager import get_url_tracking
+        tracking = get_url_tracking()
+        downloaded_urls = set(tracking.get('downloaded_urls', []))
         
-        for text, real_dl in resolved_links:
-            print(f"DEBUG: Processing URL: {real_dl}")
-            print(f"DEBUG: Already in links list: {real_dl in self.links}")
+        for text, page_link in page_links:
+            # url_rows holds exactly the URLs in the list, with O(1) lookups
+            print(f"DEBUG: Processing URL: {page_link}")
+            print(f"DEBUG: Already in links list: {page_link in self.url_rows}")
             
-            if real_dl not in self.links:
-                # Check if this URL was previously downloaded
-                from config_manager import get_url_tracking
-                tracking = get_url_tracking()
-                downloaded_urls = tracking.get('downloaded_urls', [])
-                
+            if page_link not in self.url_rows:
                 print(f"DEBUG: Total downloaded URLs in tracking: {len(downloaded_urls)}")
-                print(f"DEBUG: URL in downloaded_urls: {real_dl in downloaded_urls}")
+                print(f"DEBUG: URL in downloaded_urls: {page_link in downloaded_urls}")
                 
                 # Set status based on whether it was previously downloaded
-                if real_dl in downloaded_urls:
+                if page_link in downloaded_urls:
                     status = "completed"  # Restore completed status
-                    print(f"DEBUG: Restoring completed status for previously downloaded URL: {real_dl}")
+                    print(f"DEBUG: Restoring completed status for previously downloaded URL: {page_link}")
                 else:
                     status = "pending"  # New download
-                    print(f"DEBUG: Setting pending status for new URL: {real_dl}")
+                    print(f"DEBUG: Setting pending status for new URL: {page_link}")
                 
-                self.links.append(real_dl)
-                self.url_status[real_dl] = status
-                self.download_states[real_dl] = {"paused": False, "thread": None, "stop_event": threading.Event()}
-                self.add_url_item(real_dl)
-                new_urls.append(real_dl)
-                # Map download URL to original filename from FitGirl page
-                url_to_filename[real_dl] = text
+                self.links.append(page_link)
+                self.url_status[page_link] = status
+                self.download_states[page_link] = {"paused": False, "thread": None, "stop_event": CancelEvent()}
+                self.add_url_item(page_link, text)
+                new_urls.append(page_link)
+                # Map page URL to original filename from FitGirl page
+                url_to_filename[page_link] = text
                 added += 1
             else:
-                print(f"DEBUG: URL already exists in download list, skipping: {real_dl}")
+                print(f"DEBUG: URL already exists in download list, skipping: {page_link}")
 
         if added:
             print(f"Added {added} new URLs")
             
             # Check if this is a fresh session (no existing URLs before adding new ones)
-            existing_urls_before_add = len(self.links) - added
-            if existing_urls_before_add == 0:  # This was a fresh session
+            if links_before == 0:  # This was a fresh session
                 print(f"About to call confirm_and_clear_json for fresh session")
                 self.confirm_and_clear_json()
             
@@ -553,97 +592,93 @@ class DownloaderGUI:
 
     def update_filename_labels(self, urls, url_to_filename):
         """Update filename labels for the given URLs"""
-        for item in self.url_items:
-            if item['url'] in urls:
-                filename = url_to_filename.get(item['url'], item['url'].split('/')[-1].split('#')[0])
-                item['filename_label'].config(text=filename)
+        for url in urls:
+            item = self.url_rows.get(url)
+            if item:
+                filename = url_to_filename.get(url, url.split('/')[-1].split('#')[0])
+                self._set_row(item, filename=filename)
     
+    def _link_prefetch_ahead(self):
+        try:
+            return max(0, int(get_setting("link_prefetch_ahead", LINK_PREFETCH_AHEAD)))
+        except (TypeError, ValueError):
+            return LINK_PREFETCH_AHEAD
+
+    def _link_max_age(self):
+        """Seconds a resolved link may be used before it is resolved again"""
+        try:
+            return max(1.0, float(get_setting("link_max_age_minutes", LINK_MAX_AGE_MINUTES))) * 60
+        except (TypeError, ValueError):
+            return LINK_MAX_AGE_MINUTES * 60
+
+    def _fresh_cached_link(self, page_url):
+        """Cached link for a page if it is younger than the max age; drops it otherwise"""
+        cached = resolved_link_cache.get(page_url)
+        if cached and time.time() - cached.get('fetched', 0) < self._link_max_age():
+            return cached['link']
+        if cached:
+            print(f"Resolved link for {page_url} is too old - resolving again")
+            resolved_link_cache.forget(page_url)
+        return None
+
+    def prefetch_links(self, urls):
+        """Resolve queued pages in the background so a fresh link is ready when their turn comes"""
+        for url in urls:
+            if needs_resolution(url) and not self._fresh_cached_link(url):
+                self.link_resolver.submit(url)
+
+    def refresh_download_link(self, page_url):
+        """Resolve a page again after its link expired"""
+        resolved_link_cache.forget(page_url)
+        return self.link_resolver.submit(page_url).result()
+
+    def resolve_for_download(self, page_url):
+        """Download link for a list URL, resolved right before use (joins a prefetch already in flight)"""
+        if not needs_resolution(page_url):
+            return extract_download_link(page_url)
+        link = self._fresh_cached_link(page_url) or self.link_resolver.submit(page_url).result()
+        if not link:
+            raise IOError(f"Could not resolve a download link from {page_url}")
+        return link
+
     def extract_real_download_link(self, page_url):
+        """Resolved /dl/ link for a page, reusing the cached one while it is still valid"""
+        cached = resolved_link_cache.get(page_url)
+        if cached:
+            print(f"Using cached download link for {page_url}")
+            return cached['link']
+        link = self._scrape_real_download_link(page_url)
+        if link:
+            resolved_link_cache.record(page_url, link=link)
+        return link
+
+    def _scrape_real_download_link(self, page_url):
         """Extract the real download link by finding and clicking the download button."""
+        print(f"Extracting download link from: {page_url}")
+        
+        # First, get the page to find the download button (shared keep-alive session). Network and
+        # HTTP errors propagate so the download's retry policy sees the real cause (DNS, 429, 5xx...)
+        r = http_get(page_url, timeout=30)
+        r.raise_for_status()
+        print(f"Page status: {r.status_code}")
+        print(f"Page URL after redirects: {r.url}")
+        
         try:
-            print(f"Extracting download link from: {page_url}")
-            
-            # First, get the page to find the download button
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            })
-            
-            r = session.get(page_url, timeout=30)
-            r.raise_for_status()
-            print(f"Page status: {r.status_code}")
-            print(f"Page URL after redirects: {r.url}")
-            
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            # Method 1: Look for the download URL in JavaScript (most reliable for FitGirl)
-            print("\n=== Method 1: Looking for download URL in JavaScript ===")
-            scripts = soup.find_all("script")
-            for script in scripts:
-                if script.string and "download" in script.string.lower():
-                    # Look for the actual download URL pattern
-                    url_patterns = [
-                        r'["\']https://fuckingfast\.co/dl/([^"\']+)["\']',
-                        r'["\']([^"\']*fuckingfast\.co/dl/[^"\']*)["\']',
-                        r'["\'](/dl/[^"\']*)["\']',
-                    ]
-                    for pattern in url_patterns:
-                        matches = re.findall(pattern, script.string)
-                        if matches:
-                            for match in matches:
-                                # Reconstruct the full URL if needed
-                                if match.startswith("/dl/"):
-                                    download_url = f"https://fuckingfast.co{match}"
-                                else:
-                                    download_url = f"https://fuckingfast.co/dl/{match}"
-                                print(f"*** FOUND DOWNLOAD URL IN SCRIPT: {download_url} ***")
-                                return download_url
-            
-            # Method 2: Look for download button and try to trigger it
-            print("\n=== Method 2: Looking for download button ===")
-            download_button = soup.find("button", string=re.compile(r"download", re.IGNORECASE))
-            if download_button:
-                print(f"Found download button: {download_button.get_text(strip=True)}")
-                print(f"Button classes: {download_button.get('class')}")
-                
-                # Check if button has onclick
-                onclick = download_button.get("onclick", "")
-                if onclick:
-                    print(f"Button onclick: {onclick}")
-                    # Try to extract URL from onclick
-                    if "download()" in onclick:
-                        print("Button calls download() function - need to extract from script")
-                        # We already looked for scripts above, so this should be handled
-            
-            # Method 3: Look for any link with /dl/ in href
-            print("\n=== Method 3: Looking for direct /dl/ links ===")
-            dl_links = soup.find_all("a", href=lambda x: x and "/dl/" in x)
-            if dl_links:
-                for link in dl_links:
-                    href = link.get("href")
-                    full_url = urljoin(page_url, href)
-                    print(f"*** FOUND DIRECT DL LINK: {full_url} ***")
-                    return full_url
+            # Regex scan of the raw page first, BeautifulSoup only if that finds nothing;
+            # the method that worked for this host is tried first next time
+            html = r.text
+            download_url, method = page_parser.find(html, page_url)
+            if download_url:
+                print(f"*** FOUND DOWNLOAD URL ({method}): {download_url} ***")
+                return download_url
             
             # If we still haven't found anything, print debug info
             print(f"\n*** NO DOWNLOAD LINK FOUND ***")
             print("Debug info:")
-            
-            # Show page title
-            title = soup.find("title")
+            title = TITLE_PATTERN.search(html)
             if title:
-                print(f"  Page title: {title.get_text()}")
-            
-            # Show download button if found
-            if download_button:
-                print(f"  Download button found but no URL extracted")
-            else:
-                print("  No download button found")
-            
-            # Show script count
-            print(f"  Total scripts: {len(scripts)}")
-            download_scripts = [s for s in scripts if s.string and "download" in s.string.lower()]
-            print(f"  Scripts with 'download': {len(download_scripts)}")
+                print(f"  Page title: {title.group(1).strip()}")
+            print(f"  Mentions 'download': {'download' in html.lower()}")
             
         except Exception as e:
             print(f"Error extracting download link: {e}")
@@ -836,11 +871,16 @@ class DownloaderGUI:
    • Click "Fetch Links" button
    • App automatically extracts all fuckingfast.co download links
    • Selection window appears with all available parts
+   • Each part's real download link is fetched right before it downloads
+     (link_prefetch_ahead / link_max_age_minutes in config.json tune this)
 
 3️⃣  CONFIGURE DOWNLOAD SETTINGS
    • Download Method: Choose "built-in" (recommended)
    • Download Mode: Select "batch" for multiple files
    • Batch Size: Set 5-10 files simultaneously
+   • Adaptive: Starts at the batch size and grows/shrinks it by measured speed
+   • Segments/File: Parallel connections per file (1 = single connection)
+   • Speed Limit / Per File: Cap download speed in KB/s (0 = unlimited)
    • Download Directory: Choose where to save files
 
 4️⃣  SELECT DOWNLOAD PARTS
@@ -851,6 +891,8 @@ class DownloaderGUI:
 5️⃣  START DOWNLOADING
    • Click "Start Download" button
    • Monitor progress with progress bars
+   • Failed parts retry on their own with growing delays (🔁 icon,
+     Retries column shows count, failure type and next attempt time)
    • Use "Pause All" if needed
 
 🎯 BASIC FEATURES EXPLAINED:
@@ -940,7 +982,7 @@ We remember and honor those who sacrificed their lives for freedom and justice.
 • Invisible main window (runs in background)
 
 🎯 DOWNLOAD MANAGEMENT
-• Pause/Resume individual downloads
+• Pause/Resume individual downloads (double-click a row, or select rows and use Start/Stop)
 • Batch download control
 • Network speed monitoring
 • Progress tracking for each file
@@ -1285,15 +1327,9 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                 return False
         
         # Check if all progress bars are at 100%
-        for item in self.url_items:
-            if 'progress' in item:
-                try:
-                    max_val = float(item['progress']["maximum"])
-                    current_val = float(item['progress']["value"])
-                    if max_val > 0 and current_val < max_val:
-                        return False
-                except:
-                    return False
+        for item in self.url_rows.values():
+            if item['total'] > 0 and item['done'] < item['total']:
+                return False
         
         return True
 
@@ -1413,40 +1449,51 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         except Exception as e:
             print(f"Error triggering smart rescan after path change: {e}")
 
-    def update_url_status(self, url: str, status: str):
-        """Update URL status in download list UI"""
-        try:
-            if url in self.url_status:
-                self.url_status[url] = status
-                print(f"DEBUG: Updated URL status: {url} -> {status}")
-                
-                # Update UI in main thread
-                self.root.after(0, lambda: self._update_url_item_status(url, status))
-        except Exception as e:
-            print(f"Error updating URL status: {e}")
-    
-    def _update_url_item_status(self, url: str, status: str):
-        """Update URL item status in UI"""
-        try:
-            # Find the listbox item for this URL
-            for i in range(self.url_listbox.size()):
-                item_text = self.url_listbox.get(i)
-                if url in item_text:
-                    # Update item text with new status
-                    if status == "completed":
-                        new_text = f"✅ {item_text.replace('⏳ ', '').replace('⬇️ ', '').replace('❌ ', '')}"
-                    elif status == "failed":
-                        new_text = f"❌ {item_text.replace('⏳ ', '').replace('⬇️ ', '').replace('✅ ', '')}"
-                    elif status == "downloading":
-                        new_text = f"⬇️ {item_text.replace('⏳ ', '').replace('✅ ', '').replace('❌ ', '')}"
-                    else:
-                        new_text = f"⏳ {item_text.replace('⬇️ ', '').replace('✅ ', '').replace('❌ ', '')}"
-                    
-                    self.url_listbox.delete(i)
-                    self.url_listbox.insert(i, new_text)
-                    break
-        except Exception as e:
-            print(f"Error updating URL item status: {e}")
+    def _update_url_item_status(self, url, status):
+        """Render a URL's status icon in its row (main thread)"""
+        item = self.url_rows.get(url)
+        if not item:
+            return
+        if status == "completed":
+            total = item['total'] if item['total'] > 0 else 1
+            self._set_row_progress(item, total, total)
+        elif status == "pending":
+            self._set_row_progress(item, 0, item['total'])
+        self._set_row(item, status=STATUS_ICONS.get(status, item['status']))
+
+    def _retry_text(self, url):
+        """Retry cell for a URL: attempts so far and when the next one is due (or why it gave up)"""
+        entry = self.retry_tracker.get(url)
+        if not entry:
+            return ""
+        if entry['next_at'] is None:
+            return f"{entry['attempts']}/{entry['limit']} {entry['kind']}, gave up"
+        due = time.strftime("%H:%M:%S", time.localtime(entry['next_at']))
+        return f"{entry['attempts']}/{entry['limit']} {entry['kind']} @ {due}"
+
+    def update_retry_cell(self, url):
+        if threading.current_thread() is not threading.main_thread():
+            self.root.after(0, lambda u=url: self.update_retry_cell(u))
+            return
+        item = self.url_rows.get(url)
+        if item:
+            self._set_row(item, retry=self._retry_text(url))
+
+    def _set_row(self, item, **cells):
+        """Write only the cells of a row that actually changed"""
+        for column, value in cells.items():
+            if item.get(column) != value:
+                item[column] = value
+                self.url_tree.set(item['iid'], column, value)
+
+    def _set_row_progress(self, item, done, total):
+        """Update a row's text progress bar and percentage"""
+        item['done'], item['total'] = done, total
+        fraction = min(1.0, done / total) if total > 0 else 0.0
+        filled = int(fraction * PROGRESS_BAR_CELLS)
+        self._set_row(item,
+                      progress="█" * filled + "░" * (PROGRESS_BAR_CELLS - filled),
+                      percent=f"{int(fraction * 100)}%")
 
     def set_status(self, text):
         # Make "resolving" text red
@@ -1477,21 +1524,12 @@ We remember and honor those who sacrificed their lives for freedom and justice.
 
     def set_url_progress(self, url, maximum=None, value=None):
         def _apply():
-            for item in self.url_items:
-                if item.get('url') == url and 'progress' in item:
-                    if maximum is not None:
-                        item['progress']["maximum"] = maximum
-                    if value is not None:
-                        item['progress']["value"] = value
-                    if 'percent_label' in item:
-                        try:
-                            m = float(item['progress']["maximum"])
-                            v = float(item['progress']["value"])
-                            pct = int((v / m) * 100) if m > 0 else 0
-                        except Exception:
-                            pct = 0
-                        item['percent_label'].config(text=f"{pct}%")
-                    break
+            item = self.url_rows.get(url)
+            if not item:
+                return
+            total = maximum if maximum is not None else item['total']
+            done = value if value is not None else item['done']
+            self._set_row_progress(item, done, total)
 
         if threading.current_thread() is threading.main_thread():
             _apply()
@@ -1500,10 +1538,9 @@ We remember and honor those who sacrificed their lives for freedom and justice.
 
     def set_url_status(self, url, status):
         def _apply():
-            for item in self.url_items:
-                if item.get('url') == url and 'status_label' in item:
-                    item['status_label'].config(text=status)
-                    break
+            item = self.url_rows.get(url)
+            if item:
+                self._set_row(item, status=status)
 
         if threading.current_thread() is threading.main_thread():
             _apply()
@@ -1588,33 +1625,49 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         
         ttk.Label(list_frame, text="Paste any type of URLs (Mp3, Movies, etc...) here to download works as a download manager, But for FitGirl URLs use fetch links feature. (only F**ckingfast filehoster accepted)", font=("Segoe UI", 9, "bold"), foreground="green").grid(row=0, column=0, sticky="w")
         
-        # Create scrollable frame for URL items
-        canvas = tk.Canvas(list_frame, height=200)
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = ttk.Frame(canvas)
-        
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.grid(row=1, column=0, sticky="nsew", pady=5)
+        # Download list - a Treeview only draws the rows that are visible, so thousands of URLs stay cheap
+        columns = ("status", "url", "progress", "percent", "retry", "filename")
+        self.url_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=10, selectmode="extended")
+        self.url_tree.heading("status", text="")
+        self.url_tree.heading("url", text="URL")
+        self.url_tree.heading("progress", text="Progress")
+        self.url_tree.heading("percent", text="%")
+        self.url_tree.heading("retry", text="Retries")
+        self.url_tree.heading("filename", text="Filename")
+        
+        self.url_tree.column("status", width=40, stretch=False, anchor="center")
+        self.url_tree.column("url", width=380)
+        self.url_tree.column("progress", width=170, stretch=False)
+        self.url_tree.column("percent", width=50, stretch=False, anchor="e")
+        self.url_tree.column("retry", width=130, stretch=False)
+        self.url_tree.column("filename", width=300)
+        
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.url_tree.yview)
+        self.url_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.url_tree.grid(row=1, column=0, sticky="nsew", pady=5)
         scrollbar.grid(row=1, column=1, sticky="ns")
         
-        # Store URL items for individual control
-        self.url_items = []
+        # url -> row registry; each row holds its Treeview iid and last drawn cell values
+        self.url_rows = {}
+        self.iid_to_url = {}
         
-        # Add paste functionality
-        canvas.bind("<Control-v>", self.paste_urls)
-        canvas.bind("<Button-3>", self.show_context_menu)  # Right-click menu
+        # Add paste functionality and per-row actions
+        self.url_tree.bind("<Control-v>", self.paste_urls)
+        self.url_tree.bind("<Button-3>", self.show_context_menu)  # Right-click menu
+        self.url_tree.bind("<Double-1>", self.toggle_row_download)
+        self.url_tree.bind("<Delete>", lambda e: self.remove_selected_urls())
         
-        # Control buttons for list
+        # Control buttons for list - act on the selected rows
         list_button_frame = ttk.Frame(list_frame)
         list_button_frame.grid(row=2, column=0, pady=5)
         
+        ttk.Button(list_button_frame, text="Start", width=8, command=self.start_selected_urls).pack(side="left", padx=2)
+        ttk.Button(list_button_frame, text="Stop", width=8, command=self.stop_selected_urls).pack(side="left", padx=2)
+        ttk.Button(list_button_frame, text="❌ Remove", command=self.remove_selected_urls).pack(side="left", padx=2)
+        ttk.Label(list_button_frame, text="Double-click a row to start/stop it, right-click for more",
+                  foreground="gray").pack(side="left", padx=10)
+        
         # Download method selection and options in same row
         method_frame = ttk.Frame(self.downloader_frame)
         method_frame.pack(pady=10)
@@ -1643,6 +1696,31 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         self.batch_entry = ttk.Entry(method_frame, textvariable=self.batch_size, width=5)
         self.batch_entry.pack(side="left", padx=5)
         
+        ttk.Checkbutton(method_frame, text="Adaptive",
+                       variable=self.adaptive_concurrency).pack(side="left", padx=5)
+        
+        ttk.Label(method_frame, text="Segments/File:").pack(side="left", padx=5)
+        self.segments_entry = ttk.Entry(method_frame, textvariable=self.segments_per_file, width=5)
+        self.segments_entry.pack(side="left", padx=5)
+        
+        # Bandwidth limits - applied live to running downloads
+        speed_frame = ttk.Frame(self.downloader_frame)
+        speed_frame.pack(pady=(0, 5))
+        
+        ttk.Label(speed_frame, text="Speed Limit (KB/s):").pack(side="left", padx=5)
+        ttk.Entry(speed_frame, textvariable=self.speed_limit_kbps, width=8).pack(side="left", padx=5)
+        ttk.Label(speed_frame, text="Per File (KB/s):").pack(side="left", padx=5)
+        ttk.Entry(speed_frame, textvariable=self.file_speed_limit_kbps, width=8).pack(side="left", padx=5)
+        ttk.Label(speed_frame, text="0 = unlimited", foreground="gray").pack(side="left", padx=5)
+        ttk.Label(speed_frame, text="Write Safety:").pack(side="left", padx=5)
+        ttk.Combobox(speed_frame, textvariable=self.durability_mode, values=DURABILITY_MODES,
+                     state="readonly", width=9).pack(side="left", padx=5)
+        
+        self.speed_limit_kbps.trace_add("write", lambda *args: self.apply_speed_limits())
+        self.file_speed_limit_kbps.trace_add("write", lambda *args: self.apply_speed_limits())
+        self.durability_mode.trace_add("write", lambda *args: set_setting("durability_mode",
+                                                                         self.durability_mode.get()))
+        
         # FitGirl mode base URL input
         fitgirl_frame = ttk.Frame(self.downloader_frame)
         fitgirl_frame.pack(pady=5, padx=10, fill="x")
@@ -1683,6 +1761,7 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         ttk.Button(button_frame, text='Start Download', command=self.start).pack(side='left', padx=5)
         ttk.Button(button_frame, text='Pause All', command=self.stop_all_simultaneous).pack(side='left', padx=5)
         self.start_network_monitor()
+        self.start_progress_ticker()
         
         # Start auto-resume monitoring
         self.auto_resume.start_monitoring()
@@ -1693,16 +1772,18 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             urls = [url.strip() for url in clipboard_text.split("\n") if url.strip()]
             new_urls = []
             url_to_filename = {}
+            existing_links = set(self.links)
             
             for url in urls:
-                if url not in self.links:
+                if url not in existing_links:
+                    existing_links.add(url)
                     self.links.append(url)
                     self.url_status[url] = "pending"
-                    self.download_states[url] = {"paused": False, "thread": None, "stop_event": threading.Event()}
-                    self.add_url_item(url)
-                    new_urls.append(url)
+                    self.download_states[url] = {"paused": False, "thread": None, "stop_event": CancelEvent()}
                     # For pasted URLs, extract filename from URL (no original page info available)
                     filename = url.split('/')[-1].split('#')[0]
+                    self.add_url_item(url, filename)
+                    new_urls.append(url)
                     url_to_filename[url] = filename
             
             if urls:
@@ -1718,64 +1799,65 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         except:
             pass  # No clipboard content or error
     
-    def add_url_item(self, url):
-        # Create frame for this URL item
-        item_frame = ttk.Frame(self.scrollable_frame)
-        item_frame.pack(fill="x", padx=5, pady=2)
-        
-        # Status label
-        status_label = ttk.Label(item_frame, text="⏳", width=4)
-        status_label.pack(side="left", padx=2)
-        
-        # URL label (truncated for display)
-        display_url = url[:80] + "..." if len(url) > 80 else url
-        url_label = ttk.Label(item_frame, text=display_url, width=60)
-        url_label.pack(side="left", padx=5, fill="x", expand=True)
-
-        start_btn = ttk.Button(item_frame, text="Start", width=8)
-        start_btn.config(command=lambda u=url: self.start_single_url(u))
-        start_btn.pack(side="left", padx=2)
-
-        stop_btn = ttk.Button(item_frame, text="Stop", width=8)
-        stop_btn.config(command=lambda u=url: self.stop_single_url(u))
-        stop_btn.pack(side="left", padx=2)
-
-        progress = ttk.Progressbar(item_frame, length=220, mode="determinate")
-        progress["maximum"] = 1
-        progress["value"] = 0
-        progress.pack(side="left", padx=6)
-
-        percent_label = ttk.Label(item_frame, text="0%", width=5)
-        percent_label.pack(side="left", padx=2)
-        
-        # Filename label - get from URL tracking if available
-        from config_manager import get_url_tracking
-        tracking = get_url_tracking()
-        filename = tracking.get('url_to_filename', {}).get(url, None)
+    def add_url_item(self, url, filename=None):
+        """Append a row for `url` to the download list"""
         if not filename:
             # Fallback: extract filename from URL
             filename = url.split('/')[-1].split('#')[0]
-        filename_label = ttk.Label(item_frame, text=filename, width=50, foreground="blue")
-        filename_label.pack(side="left", padx=5)
         
-        # Remove button only
-        remove_btn = ttk.Button(item_frame, text="❌", width=3)
-        remove_btn.config(command=lambda u=url: self.remove_url(u))
-        remove_btn.pack(side="left", padx=2)
+        # URL label (truncated for display)
+        display_url = url[:80] + "..." if len(url) > 80 else url
+        status = STATUS_ICONS.get(self.url_status.get(url, "pending"), "⏳")
+        progress = "░" * PROGRESS_BAR_CELLS
+        retry = self._retry_text(url)
+        iid = self.url_tree.insert("", "end", values=(status, display_url, progress, "0%", retry, filename))
         
         # Store references
-        self.url_items.append({
+        item = {
             'url': url,
-            'frame': item_frame,
-            'status_label': status_label,
-            'url_label': url_label,
-            'start_btn': start_btn,
-            'stop_btn': stop_btn,
+            'iid': iid,
+            'status': status,
+            'url_text': display_url,
             'progress': progress,
-            'percent_label': percent_label,
-            'filename_label': filename_label,
-            'remove_btn': remove_btn
-        })
+            'percent': "0%",
+            'retry': retry,
+            'filename': filename,
+            'done': 0,
+            'total': 0,
+        }
+        self.url_rows[url] = item
+        self.iid_to_url[iid] = url
+        if self.url_status.get(url) == "completed":
+            self._set_row_progress(item, 1, 1)
+
+    def selected_urls(self):
+        """URLs of the selected rows, in list order"""
+        return [self.iid_to_url[iid] for iid in self.url_tree.selection() if iid in self.iid_to_url]
+
+    def start_selected_urls(self):
+        for url in self.selected_urls():
+            if self.url_status.get(url) not in ("downloading", "completed"):
+                self.start_single_url(url)
+
+    def stop_selected_urls(self):
+        for url in self.selected_urls():
+            if self.url_status.get(url) == "downloading":
+                self.stop_single_url(url)
+
+    def remove_selected_urls(self):
+        for url in self.selected_urls():
+            self.remove_url(url)
+
+    def toggle_row_download(self, event):
+        """Double-click: stop a running row, start any other unfinished one"""
+        url = self.iid_to_url.get(self.url_tree.identify_row(event.y))
+        if not url:
+            return
+        status = self.url_status.get(url)
+        if status == "downloading":
+            self.stop_single_url(url)
+        elif status != "completed":
+            self.start_single_url(url)
 
     def start_single_url(self, url):
         if url not in self.links:
@@ -1785,18 +1867,20 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             self.download_threads = [True]
 
         if url not in self.download_states:
-            self.download_states[url] = {"paused": False, "thread": None, "stop_event": threading.Event()}
+            self.download_states[url] = {"paused": False, "thread": None, "stop_event": CancelEvent()}
 
         self.download_states[url]["stop_event"].clear()
         self.download_states[url]["paused"] = False
         self.paused_downloads.discard(url)
+        self.retry_tracker.reset(url)
+        self.update_retry_cell(url)
 
         idx = self.links.index(url) + 1
         total = len(self.links)
         run_id = self._run_id
 
         self.update_url_status(url, "downloading")
-        self.set_url_progress(url, maximum=1, value=0)
+        self.report_progress(url, 0, 1)
         thread = threading.Thread(target=self.download_single_with_state, args=(url, idx, total, run_id), daemon=True)
         thread.start()
         self.download_states[url]["thread"] = thread
@@ -1817,18 +1901,17 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             
             # Stop the download if it's running
             if url in self.download_states:
-                self.download_states[url]["stop_event"].set()
+                state = self.download_states[url]
+                state["stop_event"].set()
+                transfer = self.active_transfers.get(url)
+                if transfer:
+                    transfer.discard()
                 
-                # Remove temporary file if it exists
-                temp_path = self.download_states[url].get("temp_path")
+                # Remove temporary files once the worker has exited, so it can't write its state back
+                temp_path = state.get("temp_path")
                 if temp_path:
-                    try:
-                        temp_file = Path(temp_path)
-                        if temp_file.exists():
-                            temp_file.unlink()
-                            print(f"Removed temporary file: {temp_path}")
-                    except Exception as e:
-                        print(f"Failed to remove temporary file {temp_path}: {e}")
+                    threading.Thread(target=self._remove_temp_files, args=(Path(temp_path), state.get("thread")),
+                                     daemon=True).start()
             
             # Remove from links list
             self.links.remove(url)
@@ -1843,15 +1926,13 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             
             # Remove from paused downloads
             self.paused_downloads.discard(url)
+            self.progress_aggregator.forget(url)
             
             # Remove from UI
-            for i, item in enumerate(self.url_items):
-                if item['url'] == url:
-                    # Destroy the frame and all its widgets
-                    item['frame'].destroy()
-                    # Remove from url_items list
-                    self.url_items.pop(i)
-                    break
+            item = self.url_rows.pop(url, None)
+            if item:
+                self.iid_to_url.pop(item['iid'], None)
+                self.url_tree.delete(item['iid'])
             
             self.set_status(f'Removed URL: {url[:50]}...')
 
@@ -1871,6 +1952,14 @@ We remember and honor those who sacrificed their lives for freedom and justice.
 
     def show_context_menu(self, event):
         menu = tk.Menu(self.root, tearoff=0)
+        row = self.url_tree.identify_row(event.y)
+        if row:
+            if row not in self.url_tree.selection():
+                self.url_tree.selection_set(row)
+            menu.add_command(label='Start', command=self.start_selected_urls)
+            menu.add_command(label='Stop', command=self.stop_selected_urls)
+            menu.add_command(label='Remove', command=self.remove_selected_urls)
+            menu.add_separator()
         menu.add_command(label='Paste URLs', command=self.paste_urls)
         menu.post(event.x_root, event.y_root)
 
@@ -1878,6 +1967,58 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         mode = self.download_mode.get()
         self.set_status(f'Download mode changed to: {mode}')
 
+    def apply_speed_limits(self):
+        """Push the KB/s entries into the shared token buckets (ignores half-typed values)"""
+        for var, apply_limit in ((self.speed_limit_kbps, set_global_limit),
+                                 (self.file_speed_limit_kbps, set_per_file_limit)):
+            try:
+                kbps = float(var.get() or 0)
+            except (ValueError, tk.TclError):
+                continue
+            apply_limit(int(max(0, kbps) * 1024))
+
+    def get_durability(self):
+        """FileSync settings for new downloads; the periodic thresholds come from config.json"""
+        try:
+            every_bytes = int(float(get_setting("durability_sync_mb", SYNC_EVERY_BYTES // (1024 * 1024))) * 1024 * 1024)
+            every_seconds = float(get_setting("durability_sync_seconds", SYNC_EVERY_SECONDS))
+        except (TypeError, ValueError):
+            every_bytes, every_seconds = SYNC_EVERY_BYTES, SYNC_EVERY_SECONDS
+        return {'mode': self.durability_mode.get(), 'every_bytes': max(1, every_bytes),
+                'every_seconds': max(0.1, every_seconds)}
+
+    def _plan_segments(self, page_url, total, ranges):
+        """Segments for a file of `total` bytes: the configured (or adaptive) count within the host's
+        spare connections, or 1 when the server doesn't do ranges or the file is too small to split"""
+        segments = self.get_segments_per_file()
+        spare = self._spare_connections(page_url)
+        if spare is not None:
+            # This download already counts as one connection to its host
+            segments = min(segments, 1 + spare)
+        if not ranges or segments < 2 or total < 2 * MIN_SEGMENT_SIZE:
+            return 1
+        return segments
+
+    def get_segments_per_file(self):
+        """Number of parallel ranged connections per file, falls back to a single stream"""
+        if self.adaptive:
+            return self.adaptive.segments_per_file
+        return self._get_user_segments()
+
+    def _get_user_segments(self):
+        """Segments/File entry value, 1 if the entry is invalid"""
+        try:
+            return max(1, int(self.segments_per_file.get()))
+        except (ValueError, tk.TclError):
+            return 1
+
+    def _get_batch_size(self):
+        """Batch size from the UI, 10 if the entry is invalid"""
+        try:
+            return max(1, int(self.batch_size.get()))
+        except (ValueError, tk.TclError):
+            return 10
+
     def start(self):
         print('=== START DOWNLOAD PRESSED ===')
         if not self.links:
@@ -1893,13 +2034,17 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         
         self.stop_downloads()  # Stop any existing downloads
         
+        # A fresh run gets a fresh retry budget
+        for url in self.retry_tracker.clear():
+            self.update_retry_cell(url)
+        
         # Initialize download threads tracking
         self.download_threads = [True]  # Use as a flag to indicate running
         print("Download threads initialized")
         
         for url in self.links:
             if url not in self.download_states:
-                self.download_states[url] = {"paused": False, "thread": None, "stop_event": threading.Event()}
+                self.download_states[url] = {"paused": False, "thread": None, "stop_event": CancelEvent()}
             else:
                 # Only clear stop event if URL wasn't manually stopped (not in paused_downloads)
                 if url not in self.paused_downloads:
@@ -1910,6 +2055,32 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         run_id = self._run_id
 
         mode = self.download_mode.get()
+        
+        # Make sure the sizes we already know about fit on the download drive
+        pending = [url for url in self.links if self.url_status.get(url) != "completed"]
+        remaining, unknown = self.plan_downloads(pending)
+        try:
+            self.download_dir.mkdir(parents=True, exist_ok=True)
+            free = shutil.disk_usage(self.download_dir).free
+        except Exception as e:
+            print(f"Could not check free disk space: {e}")
+            free = None
+        print(f"Disk plan: {remaining} bytes to fetch ({unknown} URLs of unknown size), {free} bytes free")
+        if free is not None and remaining > free:
+            if not messagebox.askyesno(
+                    "Not enough disk space",
+                    f"The queued downloads need at least {remaining / 1024 ** 3:.2f} GB but only "
+                    f"{free / 1024 ** 3:.2f} GB is free in {self.download_dir}.\n\nStart anyway?"):
+                self.download_threads = []
+                return
+        
+        # Size the shared keep-alive pool for every connection this run can open at once
+        concurrency = 1 if mode == "one_by_one" else self._get_batch_size()
+        connections = concurrency * self._get_user_segments()
+        if mode != "one_by_one" and self.adaptive_concurrency.get():
+            connections = max(connections, HOST_CONNECTION_LIMIT)
+        configure_pool(connections)
+        
         if mode == "one_by_one":
             print("Starting ONE BY ONE mode")
             self.set_status("Downloading now...")
@@ -1927,6 +2098,9 @@ We remember and honor those who sacrificed their lives for freedom and justice.
     
     def stop_downloads(self):
         self._run_id += 1
+        # Stop dispatching queued URLs
+        if self.scheduler:
+            self.scheduler.stop()
         # Signal all threads to stop
         for url, state in self.download_states.items():
             state["stop_event"].set()
@@ -1966,6 +2140,31 @@ We remember and honor those who sacrificed their lives for freedom and justice.
 
         self.root.after(500, self.monitor_network)
 
+    def report_progress(self, url, downloaded, total):
+        """Record download progress from any thread; drawn by the next progress tick"""
+        self.progress_aggregator.update(url, downloaded, total)
+
+    def start_progress_ticker(self):
+        """Render coalesced download progress about 10 times per second"""
+        self.root.after(PROGRESS_TICK_MS, self._progress_tick)
+
+    def _progress_tick(self):
+        try:
+            changed = self.progress_aggregator.drain_changed()
+            for url, (done, total) in changed.items():
+                item = self.url_rows.get(url)
+                if item:
+                    self._render_url_progress(item, done, total)
+        except Exception as e:
+            print("Progress tick error:", e)
+        self.root.after(PROGRESS_TICK_MS, self._progress_tick)
+
+    def _render_url_progress(self, item, done, total):
+        """Draw one row's progress bar, percent and (while it is running) status text"""
+        self._set_row_progress(item, done, total)
+        if self.url_status.get(item['url']) not in ("completed", "paused", "stopped", "error", "retrying"):
+            self._set_row(item, status=item['percent'])
+
     def update_url_status(self, url, status):
         if threading.current_thread() is not threading.main_thread():
             self.root.after(0, lambda u=url, s=status: self.update_url_status(u, s))
@@ -1973,128 +2172,169 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         self.url_status[url] = status
         
         # Update the UI item
-        for item in self.url_items:
-            if item['url'] == url:
-                if status == "completed":
-                    item['status_label'].config(text="✅")
-                    if 'start_btn' in item:
-                        item['start_btn'].config(state="disabled")
-                    if 'stop_btn' in item:
-                        item['stop_btn'].config(state="disabled")
-                    if 'percent_label' in item:
-                        item['percent_label'].config(text="100%")
-                elif status == "downloading":
-                    item['status_label'].config(text="⬇️")
-                    if 'start_btn' in item:
-                        item['start_btn'].config(state="disabled")
-                    if 'stop_btn' in item:
-                        item['stop_btn'].config(state="normal")
-                elif status == "paused":
-                    item['status_label'].config(text="⏸️")
-                    if 'start_btn' in item:
-                        item['start_btn'].config(state="normal")
-                    if 'stop_btn' in item:
-                        item['stop_btn'].config(state="disabled")
-                elif status == "error":
-                    item['status_label'].config(text="❌")
-                    if 'start_btn' in item:
-                        item['start_btn'].config(state="normal")
-                    if 'stop_btn' in item:
-                        item['stop_btn'].config(state="disabled")
-                elif status == "pending":
-                    item['status_label'].config(text="⏳")
-                    if 'start_btn' in item:
-                        item['start_btn'].config(state="normal")
-                    if 'stop_btn' in item:
-                        item['stop_btn'].config(state="disabled")
-                    if 'percent_label' in item:
-                        item['percent_label'].config(text="0%")
-                break
+        self._update_url_item_status(url, status)
     
     def run_one_by_one(self, run_id):
         print("=== RUN ONE BY ONE STARTED ===")
-        for idx, page_url in enumerate(self.links):
-            if run_id != self._run_id:
-                print("Run id changed; stopping one-by-one worker")
-                break
-            if not self.download_threads or not self.download_threads[0]:  # Check if stopped
-                print("Download stopped, breaking loop")
-                break
-            
-            print(f"Processing URL {idx + 1}/{len(self.links)}: {page_url}")
-            
-            # Skip URLs that are already completed
-            current_status = self.url_status.get(page_url, "pending")
-            if current_status == "completed":
-                print(f"Skipping already completed URL: {page_url}")
-                continue
-            
-            self.download_single_with_state(page_url, idx + 1, len(self.links), run_id)
-            
-            # Wait for current download to finish before starting next
-            while (run_id == self._run_id and 
-                   self.download_threads and 
-                   self.download_threads[0] and
-                   page_url in self.download_states and
-                   self.download_states[page_url].get("thread") and
-                   self.download_states[page_url]["thread"].is_alive()):
-                time.sleep(0.5)
+        self._run_scheduled(run_id, max_workers=1)
         
         print("=== RUN ONE BY ONE FINISHED ===")
+        print(f"HTTP pool stats: {get_pool_stats()}")
+        print(f"Stall watchdog: {watchdog.stats()}")
         if run_id == self._run_id:
             self.set_status("All downloads completed")
 
     def run_batch(self, run_id):
         print("=== RUN BATCH STARTED ===")
-        try:
-            batch_size = int(self.batch_size.get())
-        except ValueError:
-            batch_size = 10
-        
-        # Process URLs in batches
-        for i in range(0, len(self.links), batch_size):
-            if run_id != self._run_id:
-                print("Run id changed; stopping batch worker")
-                break
-            if not self.download_threads or not self.download_threads[0]:
-                print("Download stopped, breaking batch loop")
-                break
-            
-            batch = self.links[i:i + batch_size]
-            print(f"Starting batch {i//batch_size + 1}: {batch}")
-            
-            # Start all downloads in this batch
-            threads = []
-            for page_url in batch:
-                # Skip URLs that are already completed
-                current_status = self.url_status.get(page_url, "pending")
-                if current_status == "completed":
-                    print(f"Skipping already completed URL in batch: {page_url}")
-                    continue
-                
-                idx = self.links.index(page_url) + 1
-                thread = threading.Thread(
-                    target=self.download_single_with_state,
-                    args=(page_url, idx, len(self.links), run_id),
-                    daemon=True
-                )
-                thread.start()
-                self.download_states[page_url]["thread"] = thread
-                threads.append(thread)
-            
-            # Wait for all downloads in this batch to complete
-            for thread in threads:
-                while (run_id == self._run_id and 
-                       self.download_threads and 
-                       self.download_threads[0] and
-                       thread.is_alive()):
-                    time.sleep(0.5)
+        batch_size = self._get_batch_size()
+        print(f"Sliding window of {batch_size} simultaneous downloads")
+        self._run_scheduled(run_id, max_workers=batch_size)
         
         print("=== RUN BATCH FINISHED ===")
+        print(f"HTTP pool stats: {get_pool_stats()}")
+        print(f"Stall watchdog: {watchdog.stats()}")
         if run_id == self._run_id:
             self.set_status("All downloads completed")
 
-    def download_single_with_state(self, page_url, current_idx, total_idx, run_id):
+    def _is_complete_on_disk(self, path, meta, page_url=None):
+        """True if `path` exists and matches the cached size (any size counts when the size is unknown),
+        and the checksum recorded when this URL was downloaded, if there is one"""
+        if not path.exists():
+            return False
+        stored = get_url_checksum(page_url) if page_url else None
+        size = meta.get('size') or (stored or {}).get('size')
+        if size and path.stat().st_size != size:
+            print(f"{path.name} is {path.stat().st_size} bytes but the server reported {size} - not complete")
+            return False
+        if stored and stored.get('md5') and stored.get('size') == path.stat().st_size:
+            hasher = StreamingHasher()
+            hasher.catch_up(path, stored['size'])
+            if hasher.digests()['md5'] != stored['md5']:
+                print(f"{path.name} doesn't match the MD5 recorded when it was downloaded - not complete")
+                return False
+            print(f"{path.name} verified against its recorded MD5")
+        return True
+
+    def plan_downloads(self, urls):
+        """(bytes still to fetch, number of URLs of unknown size) from the metadata cache"""
+        known = metadata_cache.get_many(urls)
+        remaining = 0
+        unknown = 0
+        for url in urls:
+            meta = known.get(url)
+            if not meta or not meta.get('size'):
+                unknown += 1
+                continue
+            have = 0
+            if meta.get('filename'):
+                have = resume_offset(self.download_dir / (_sanitize_filename(meta['filename']) + ".tmp"))
+            remaining += max(0, meta['size'] - have)
+        return remaining, unknown
+
+    def order_downloads(self, urls):
+        """Queue order for a run: files the cache knows can't be split (single connection, so the
+        slowest to finish) go first, largest first; everything else keeps its list order"""
+        known = metadata_cache.get_many(urls)
+        unsplittable = [url for url in urls
+                        if known.get(url, {}).get('ranges') is False and known[url].get('size')]
+        if not unsplittable:
+            return urls
+        unsplittable.sort(key=lambda url: -known[url]['size'])
+        print(f"Starting {len(unsplittable)} downloads without Range support first")
+        first = set(unsplittable)
+        return unsplittable + [url for url in urls if url not in first]
+
+    def _run_scheduled(self, run_id, max_workers):
+        """Feed every unfinished URL through a sliding-window scheduler until the queue drains"""
+        if run_id != self._run_id:
+            print("Run id changed; not starting scheduler")
+            return
+        
+        pending = []
+        for page_url in self.links:
+            # Skip URLs that are already completed
+            if self.url_status.get(page_url, "pending") == "completed":
+                print(f"Skipping already completed URL: {page_url}")
+                continue
+            pending.append(page_url)
+        
+        remaining, unknown = self.plan_downloads(pending)
+        pending = self.order_downloads(pending)
+        print(f"Scheduling {len(pending)} downloads: {remaining / 1024 / 1024:.1f} MB known, {unknown} of unknown size")
+        
+        def worker(page_url):
+            if run_id != self._run_id or page_url not in self.links:
+                return
+            if page_url in self.download_states:
+                self.download_states[page_url]["thread"] = threading.current_thread()
+            if self.url_status.get(page_url) == "retrying":
+                self.update_url_status(page_url, "pending")
+            idx = self.links.index(page_url) + 1
+            print(f"Processing URL {idx}/{len(self.links)}: {page_url}")
+            self.download_single_with_state(page_url, idx, len(self.links), run_id)
+        
+        adaptive = max_workers > 1 and self.adaptive_concurrency.get()
+        scheduler = DownloadScheduler(worker, max_workers=max_workers, on_change=self._on_scheduler_change,
+                                      max_per_host=HOST_CONNECTION_LIMIT if adaptive else None,
+                                      connections=self._transfer_connections)
+        self.scheduler = scheduler
+        controller = None
+        if adaptive:
+            # Start from the batch size and let measured goodput move it up or down
+            controller = AdaptiveConcurrency(scheduler, meter.total, max_segments=self._get_user_segments(),
+                                             on_change=self._on_scheduler_change)
+            self.adaptive = controller
+            controller.start()
+        
+        scheduler.submit(pending)
+        scheduler.run()
+        
+        if controller:
+            controller.stop()
+            if self.adaptive is controller:
+                self.adaptive = None
+        if self.scheduler is scheduler:
+            self.scheduler = None
+
+    def _transfer_connections(self, page_url):
+        """Connections a running download holds: its segment and hedge lanes, or one single stream"""
+        segmented = self.active_transfers.get(page_url)
+        return segmented.connections() if segmented else 1
+
+    def _spare_connections(self, page_url):
+        """Connections this download's host can still take under the run's per-host limit, or None without one"""
+        scheduler = self.scheduler
+        return scheduler.spare_connections(page_url) if scheduler else None
+
+    def _run_is_in_tail(self, stats):
+        """Nothing left to start: whatever is still running is what the run (and extraction) waits on"""
+        return stats['queued'] == 0 and stats['waiting'] == 0
+
+    def _on_scheduler_change(self, stats):
+        """Show queue depth, active workers and the chosen concurrency in the status bar"""
+        scheduler = self.scheduler
+        if scheduler:
+            # Keep the next few queued pages resolved just ahead of the downloads
+            self.prefetch_links(scheduler.peek(self._link_prefetch_ahead()))
+        if self._run_is_in_tail(stats):
+            # The last files of the run may hedge their slowest ranges, not just their final 10%
+            for segmented in list(self.active_transfers.values()):
+                segmented.tail = True
+        text = (f"Downloading: {stats['active']} active, {stats['queued']} queued, "
+                f"{stats['completed']} finished, {stats['waiting']} waiting to retry "
+                f"(window {stats['max_workers']}")
+        adaptive = self.adaptive
+        if adaptive:
+            text += (f" x {adaptive.segments_per_file} segments, adaptive @ "
+                     f"{adaptive.goodput / 1024 / 1024:.1f} MB/s")
+        text += ")"
+        stalls = watchdog.stats()
+        if stalls['recycles']:
+            reasons = ", ".join(f"{count} {reason}" for reason, count in stalls['reasons'].items())
+            text += f" - {stalls['recycles']} stalled connections recycled ({reasons})"
+        self.set_status(text)
+
+    def download_single_with_state(self, page_url, current_idx, total_idx, run_id, link_refreshes=0):
         print(f"=== DOWNLOAD SINGLE STARTED for {page_url} ===")
         if run_id != self._run_id:
             print("Run id changed; aborting download")
@@ -2115,16 +2355,25 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             self.root.after(0, lambda: self.update_url_status(page_url, "completed"))
             return
         
-        # Check 2: File already exists on disk
+        # Check 2: File already exists on disk (and has the size the server reported, when we know it)
         url_to_filename = tracking.get('url_to_filename', {})
-        if page_url in url_to_filename:
-            filename = url_to_filename[page_url]
+        meta = metadata_cache.get(page_url) or {}
+        known_filename = meta.get('filename') or url_to_filename.get(page_url)
+        if known_filename:
+            filename = known_filename
             download_dir = get_setting("download_directory", "")
             if download_dir:
                 file_path = Path(download_dir) / filename
+                checked = {}
+                
+                def is_complete(path):
+                    # The names tried below often point at the same file - check (and hash) it once
+                    if path not in checked:
+                        checked[path] = self._is_complete_on_disk(path, meta, page_url)
+                    return checked[path]
                 
                 # Try exact match first
-                if file_path.exists():
+                if is_complete(file_path):
                     print(f"File already exists on disk, skipping: {filename}")
                     # Mark as downloaded in tracking
                     if page_url not in downloaded_urls:
@@ -2139,7 +2388,7 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                 # Try Unicode normalization (replace various Unicode dashes with --)
                 normalized_filename = filename.replace('�', '--').replace('–', '--').replace('—', '--')
                 normalized_path = Path(download_dir) / normalized_filename
-                if normalized_path.exists():
+                if is_complete(normalized_path):
                     print(f"File already exists on disk (normalized), skipping: {normalized_filename}")
                     # Mark as downloaded in tracking
                     if page_url not in downloaded_urls:
@@ -2168,9 +2417,10 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                                 if existing_game_name:
                                     existing_game = existing_game_name.group(1).lower()
                                     # Check if game names match (handle Unicode differences)
-                                    if (game_name == existing_game or 
-                                        game_name.replace('�', '--') == existing_game or
-                                        existing_game.replace('�', '--') == game_name):
+                                    if ((game_name == existing_game or 
+                                         game_name.replace('�', '--') == existing_game or
+                                         existing_game.replace('�', '--') == game_name) and
+                                            is_complete(existing_file)):
                                         print(f"Found matching part file on disk, skipping: {existing_file.name}")
                                         # Mark as downloaded in tracking
                                         if page_url not in downloaded_urls:
@@ -2183,11 +2433,35 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                                         return
         
         stop_event = self.download_states.get(page_url, {}).get("stop_event")
+        real_url = None
         try:
-            real_url = extract_download_link(page_url)
+            real_url = self.resolve_for_download(page_url)
             print(f"Extracted real URL: {real_url}")
             
-            with requests.get(real_url, stream=True, headers={}, timeout=(20, 10)) as r:
+            # Guess the .tmp a previous attempt left behind so the very first request can already resume
+            temp_hint = self.download_states.get(page_url, {}).get("temp_path")
+            if not temp_hint and known_filename:
+                temp_hint = self.download_dir / (_sanitize_filename(known_filename) + ".tmp")
+            offset = resume_offset(temp_hint) if temp_hint else 0
+            # Ask a little before the resume point so those bytes can be compared with the .tmp, and only
+            # let the server honour the Range if the file is still the one we started (If-Range)
+            validator = resume_validator(meta.get('etag'), meta.get('last_modified'))
+            overlap = min(RESUME_OVERLAP, offset)
+            # A fresh file the cache knows can be split gets its segment plan before any request goes
+            # out; the first request then asks for segment 0 only, so its connection is reused afterwards
+            planned = 1
+            if offset == 0 and meta.get('size') and meta.get('ranges'):
+                planned = self._plan_segments(page_url, meta['size'], True)
+            first_end = split_ranges(meta['size'], planned)[0]['end'] if planned > 1 else None
+            print(f"Requesting from byte {offset - overlap} (resume hint: {temp_hint}, If-Range: {validator}, "
+                  f"planned segments: {planned})")
+            
+            r = open_from(real_url, offset - overlap, validator, first_end)
+            if r.status_code == 416:
+                # The guessed offset is past the end of this file - fall back to a plain request
+                r.close()
+                r = http_get(real_url, stream=True, timeout=(20, 10))
+            try:
                 r.raise_for_status()
                 print(f"Response status: {r.status_code}")
                 print(f"Response headers: {dict(r.headers)}")
@@ -2204,22 +2478,54 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                 if page_url in self.download_states:
                     self.download_states[page_url]["temp_path"] = str(temp_dest)
 
-                # Check if partial download exists
-                initial_pos = 0
-                if temp_dest.exists():
-                    initial_pos = temp_dest.stat().st_size
-                    print(f"Resuming from position: {initial_pos}")
-
-                if initial_pos > 0:
+                # Check if partial download exists (segmented .tmp files resume from their own state)
+                segmented_resume = has_segment_state(temp_dest)
+                needed = resume_offset(temp_dest)
+                overlap = min(RESUME_OVERLAP, needed)
+                hand_over = True  # Whether the open response feeds the segment it starts in
+                start, total = response_span(r)
+                if start != needed - overlap and r.status_code == 206:
+                    # The guess pointed at a different .tmp - ask again from the offset this file needs
+                    print(f"Resume hint was wrong (got byte {start}, need {needed}) - re-requesting")
                     r.close()
-                    headers = {"Range": f"bytes={initial_pos}-"}
-                    print(f"Using range headers: {headers}")
-                    r = requests.get(real_url, stream=True, headers=headers, timeout=(20, 10))
+                    r = open_from(real_url, needed - overlap, validator)
                     r.raise_for_status()
+                    start, total = response_span(r)
                     print(f"Response status (resume): {r.status_code}")
-                    print(f"Response headers (resume): {dict(r.headers)}")
+                if start != needed - overlap:
+                    if r.status_code == 206:
+                        raise IOError(f"Server answered from byte {start}, expected {needed - overlap}")
+                    # Range ignored, or If-Range says the remote file changed - the body starts at byte 0
+                    print(f"Server sent the whole file (Range ignored or file changed) - restarting {filename} from byte 0")
+                    clear_segment_state(temp_dest)
+                    segmented_resume, needed = False, 0
+                elif overlap:
+                    if verify_overlap(r, temp_dest, needed, overlap):
+                        print(f"Verified {overlap} bytes before byte {needed} against the server - continuing")
+                        start = needed
+                    elif segmented_resume:
+                        # The engine re-checks every resumed segment and refetches only the ones that differ
+                        print(f"Bytes before {needed} don't match the server - re-verifying segments")
+                        r.close()
+                        hand_over = False
+                    else:
+                        # A torn or foreign tail in an appended .tmp - the only safe option is a fresh start
+                        print(f"Bytes before {needed} don't match the server - restarting {filename} from byte 0")
+                        r.close()
+                        r = http_get(real_url, stream=True, timeout=(20, 10))
+                        r.raise_for_status()
+                        start, total = response_span(r)
+                        needed = 0
+                initial_pos = 0 if segmented_resume else needed
+                if initial_pos > 0:
+                    print(f"Resuming from position: {initial_pos}")
+                
+                if total > 0:
+                    metadata_cache.record(page_url, size=total, filename=filename,
+                                          etag=r.headers.get("ETag"),
+                                          last_modified=r.headers.get("Last-Modified"),
+                                          ranges=r.status_code == 206)
 
-                resp = r
                 if self.download_method.get() == "browser":
                     # Open in browser
                     print("Opening in browser")
@@ -2231,33 +2537,120 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                 print("Starting built-in download")
                 
                 # Always download any file (archives, images, videos, documents, etc.)
-                total = int(r.headers.get("Content-Length", 0))
-                if initial_pos > 0 and "Content-Range" in r.headers:
-                    total = int(r.headers["Content-Range"].split("/")[1])
-                
                 print(f"Total size: {total} bytes")
                 downloaded = initial_pos
-                self.set_progress(maximum=total, value=downloaded)
-                self.set_url_progress(page_url, maximum=total, value=downloaded)
+                self.report_progress(page_url, downloaded, total)
                 print(f"Progress bar set: max={total}, current={downloaded}")
                 
-                print("About to enter file writing loop...")
-                chunk_num = 0
-                with open(temp_dest, "ab" if initial_pos > 0 else "wb") as f:
-                    print("File opened for writing, starting chunk loop...")
-                    for chunk in r.iter_content(CHUNK_SIZE):
-                        chunk_num += 1
-                        if stop_event.is_set():
-                            print(f"Download stopped for {page_url}")
-                            break
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        self.set_progress(maximum=total, value=downloaded)
-                        self.set_url_progress(page_url, maximum=total, value=downloaded)
-                        percent = int((downloaded / total) * 100) if total > 0 else 0
-                        self.set_url_status(page_url, f"{percent}%")
+                # Checksums are computed from the bytes as they are written
+                hasher = StreamingHasher()
+                durability = self.get_durability()
                 
-                print(f"Exited file writing loop. Total chunks processed: {chunk_num}")
+                if total > 0 and (segmented_resume or initial_pos == 0):
+                    # Known size: preallocate the .tmp and write at offsets. Use several ranged
+                    # connections when the user asked for it and the server allows it, otherwise
+                    # a single segment fed by the response that is already open
+                    if segmented_resume:
+                        segments = 1
+                    elif planned > 1 and r.status_code == 206 and total == meta.get('size'):
+                        segments = planned  # Decided from the cache before the request
+                    else:
+                        if r.status_code != 206:
+                            # We asked for a range and got the whole body - the server can't be split
+                            print("Range support: False - using a single connection")
+                        segments = self._plan_segments(page_url, total, r.status_code == 206)
+
+                    refresh_url = None
+                    if real_url != page_url:
+                        refresh_url = lambda: self.refresh_download_link(page_url)
+
+                    def on_segment_progress(done, size):
+                        self.report_progress(page_url, done, size)
+
+                    segmented = SegmentedDownload(real_url, temp_dest, total, segments, stop_event,
+                                                  on_segment_progress, file_bucket=new_file_bucket(),
+                                                  hasher=hasher, refresh_url=refresh_url,
+                                                  validator=resume_validator(r.headers.get("ETag"),
+                                                                             r.headers.get("Last-Modified")),
+                                                  durability=durability,
+                                                  spare_connection=lambda: self._spare_connections(page_url) != 0)
+                    on_segment_progress(segmented.downloaded, total)
+                    # Hash the part of the first segment already on disk so it carries on hashing inline
+                    hasher.catch_up(temp_dest, segmented.segments[0]['pos'])
+                    if segmented.writer.allocation in ("sparse", "none") and hasattr(os, "posix_fallocate"):
+                        # The filesystem can't reserve space - a full disk only shows up when a write fails
+                        self.set_status(f"Disk space not reserved for {filename} (no fallocate support) - continuing")
+                    scheduler = self.scheduler
+                    segmented.tail = scheduler is None or self._run_is_in_tail(scheduler.get_stats())
+                    self.active_transfers[page_url] = segmented
+                    try:
+                        span = parse_content_range(r.headers.get("Content-Range")) if r.status_code == 206 else None
+                        segmented.run(first_response=r if hand_over else None, first_offset=start,
+                                      first_end=span[1] if span else None)
+                    finally:
+                        self.active_transfers.pop(page_url, None)
+                    if segmented.recycles:
+                        print(f"{filename}: {segmented.recycles} stalled connections recycled")
+                    if segmented.hedges:
+                        print(f"{filename}: {segmented.hedges} hedged requests, {segmented.hedges_won} finished first")
+                else:
+                    # Unknown size or a .tmp from an older append-only download
+                    print("About to enter file writing loop...")
+                    chunk_num = 0
+                    throttle = Throttle(new_file_bucket())
+                    if initial_pos > 0:
+                        # Only the part already on disk has to be read back
+                        hasher.catch_up(temp_dest, initial_pos)
+                    lane = watchdog.register(filename, throttle.is_capped)
+                    try:
+                        with open(temp_dest, "ab" if initial_pos > 0 else "wb") as f:
+                            print("File opened for writing, starting chunk loop...")
+                            file_sync = FileSync(f, **durability)
+                            while True:
+                                lane.attach(r)
+                                watch_response(stop_event, r)
+                                try:
+                                    for chunk in Receiver(r).chunks():
+                                        chunk_num += 1
+                                        if stop_event.is_set():
+                                            print(f"Download stopped for {page_url}")
+                                            break
+                                        f.write(chunk)
+                                        file_sync.wrote(len(chunk))
+                                        if file_sync.due():
+                                            file_sync.sync()
+                                        hasher.update(downloaded, chunk)
+                                        downloaded += len(chunk)
+                                        lane.add(len(chunk))
+                                        self.report_progress(page_url, downloaded, total)
+                                        throttle.consume(len(chunk), stop_event)
+                                except Exception:
+                                    if not lane.reason:
+                                        raise
+                                reason = lane.take_recycle()
+                                if not reason or stop_event.is_set():
+                                    break
+                                # The watchdog dropped a stalled connection - continue on a fresh one
+                                unwatch_response(stop_event, r)
+                                r.close()
+                                r = open_from(real_url, downloaded, resume_validator(r.headers.get("ETag"),
+                                                                                   r.headers.get("Last-Modified")))
+                                # An expired link (403/404/410) is re-resolved by the handler below and
+                                # the .tmp resumed, like the first request; other statuses go to retries
+                                r.raise_for_status()
+                                if r.status_code != 206 or response_span(r)[0] != downloaded:
+                                    raise IOError(f"Could not resume {filename} at byte {downloaded} "
+                                                  f"after recycling a stalled connection")
+                                print(f"Recycled stalled connection for {filename} ({reason}), "
+                                      f"resuming at byte {downloaded}")
+                            if not stop_event.is_set():
+                                file_sync.finish()
+                    finally:
+                        watchdog.unregister(lane)
+                    
+                    print(f"Exited file writing loop. Total chunks processed: {chunk_num}")
+                    if total > 0 and downloaded != total and not stop_event.is_set():
+                        raise IOError(f"Connection closed at byte {downloaded} of {total} for {filename}")
             
                 if not stop_event.is_set():
                     print(f"Download completed. Renaming {temp_dest} to {dest}")
@@ -2265,21 +2658,22 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                     # Check if final file already exists and is complete
                     if dest.exists():
                         existing_size = dest.stat().st_size
-                        expected_size = total  # Total expected size from headers
+                        expected_size = (metadata_cache.get(page_url) or {}).get('size', total)
                         
                         print(f"File already exists: {dest}")
                         print(f"Existing file size: {existing_size} bytes")
                         print(f"Expected size: {expected_size} bytes")
                         
-                        # If existing file is complete (within 1% tolerance), skip download
-                        if abs(existing_size - expected_size) <= (expected_size * 0.01):
+                        # If existing file has exactly the size the server reported (and its recorded MD5), skip download
+                        if (expected_size and existing_size == expected_size
+                                and self._is_complete_on_disk(dest, {'size': expected_size}, page_url)):
                             print(f"File already complete - skipping download")
                             # Remove temp file
                             if temp_dest.exists():
                                 temp_dest.unlink()
                             # Update status to completed
                             self.update_url_status(page_url, "completed")
-                            self.set_url_progress(page_url, maximum=total, value=total)
+                            self.report_progress(page_url, total, total)
                             return
                         else:
                             print(f"Existing file incomplete - replacing")
@@ -2288,13 +2682,25 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                             except Exception as e:
                                 print(f"Failed to remove existing file: {e}")
                     
-                    # Rename temp file to final name
+                    # Hash whatever segments wrote out of order, then rename temp file to final name
+                    digests = None
                     if temp_dest.exists():
+                        size = temp_dest.stat().st_size
+                        hasher.catch_up(temp_dest, size)
+                        digests = hasher.digests()
                         temp_dest.rename(dest)
+                        if durability['mode'] != "none":
+                            # The rename has to be on disk before tracking says the file is there
+                            sync_directory(dest.parent)
                     
                     # Mark URL as downloaded
                     add_downloaded_url(page_url)
+                    if digests:
+                        set_url_checksum(page_url, filename, size, digests)
+                        print(f"Checksums for {filename}: {digests}")
                     
+                    self.retry_tracker.reset(page_url)
+                    self.update_retry_cell(page_url)
                     self.update_url_status(page_url, "completed")
                     self.set_status(f"Completed: {filename}")
                     print(f"=== DOWNLOAD SINGLE COMPLETED for {page_url} ===")
@@ -2305,19 +2711,61 @@ We remember and honor those who sacrificed their lives for freedom and justice.
                     self.update_url_status(page_url, "stopped")
                     self.set_status(f"Stopped: {filename}")
                     print(f"=== DOWNLOAD SINGLE STOPPED for {page_url} ===")
+            finally:
+                unwatch_response(stop_event, r)
+                r.close()
                 
         except Exception as e:
             print(f"Error downloading {page_url}: {e}")
+            status = http_status(e)
+            if status in LINK_EXPIRED_STATUSES:
+                # The resolved link expired on the host - drop it so the page is resolved again
+                resolved_link_cache.forget(page_url)
+                if (real_url and real_url != page_url and link_refreshes < LINK_REFRESH_LIMIT
+                        and not (stop_event and stop_event.is_set()) and run_id == self._run_id):
+                    # Start over with a fresh link; the .tmp is continued with a ranged request
+                    print(f"Download link for {page_url} expired (HTTP {status}) - resolving again and resuming")
+                    return self.download_single_with_state(page_url, current_idx, total_idx, run_id,
+                                                           link_refreshes + 1)
+            if stop_event and stop_event.is_set():
+                self.update_url_status(page_url, "stopped")
+                return
+            if self.schedule_retry(page_url, e, run_id):
+                return
             self.update_url_status(page_url, "error")
             self.set_status(f"Error: {e}")
+
+    def schedule_retry(self, page_url, error, run_id):
+        """Queue a failed download again after its class's backoff; False if it should stay failed"""
+        scheduler = self.scheduler
+        if scheduler is None or scheduler.is_stopped() or run_id != self._run_id:
+            # No run to pick a retry up (single-row start, or the run already ended)
+            self.retry_tracker.cancel(page_url)
+            self.update_retry_cell(page_url)
+            return False
+        delay = self.retry_tracker.failed(page_url, error)
+        self.update_retry_cell(page_url)
+        entry = self.retry_tracker.get(page_url)
+        if delay is None:
+            print(f"Not retrying {page_url}: {entry['kind']} after {entry['attempts']} retries")
+            return False
+        print(f"Retry {entry['attempts']}/{entry['limit']} of {page_url} ({entry['kind']}) in {delay:.1f}s")
+        scheduler.submit_later(page_url, delay)
+        self.update_url_status(page_url, "retrying")
+        self.set_status(f"Retrying in {delay:.0f}s ({entry['kind']}): {page_url[:50]}...")
+        return True
     
     def retry_failed_downloads(self):
-        """Retry stopped or failed downloads"""
+        """Retry stopped or failed downloads, skipping failures a retry cannot fix (disk full, 4xx)"""
         failed_urls = []
         
         # Find all stopped or failed downloads
         for url, status in self.url_status.items():
-            if status in ["stopped", "error"]:
+            if status in ["stopped", "error"] and url in self.links:
+                entry = self.retry_tracker.get(url)
+                if entry and entry['kind'] in PERMANENT_CLASSES:
+                    print(f"Not retrying {url}: {entry['kind']}")
+                    continue
                 failed_urls.append(url)
         
         if not failed_urls:
@@ -2326,22 +2774,30 @@ We remember and honor those who sacrificed their lives for freedom and justice.
         
         self.set_status(f"Retrying {len(failed_urls)} failed downloads...")
         
-        # Reset status for failed downloads
+        # Reset status and retry budget for failed downloads
         for url in failed_urls:
+            self.retry_tracker.reset(url)
+            self.update_retry_cell(url)
+            if url in self.download_states:
+                self.download_states[url]["stop_event"].clear()
+            self.paused_downloads.discard(url)
             self.update_url_status(url, "pending")
         
         # Start retry in background
-        threading.Thread(target=self._retry_downloads_thread, args=(failed_urls,), daemon=True).start()
+        threading.Thread(target=self._retry_downloads_thread, args=(failed_urls, self._run_id),
+                         daemon=True).start()
     
-    def _retry_downloads_thread(self, failed_urls):
-        """Handle retry of failed downloads in background thread"""
-        for url in failed_urls:
-            if self.download_mode.get() == "one_by_one":
-                self.run_one_by_one()
-                break
-            else:  # batch mode
-                self.run_batch()
-                break
+    def _retry_downloads_thread(self, failed_urls, run_id):
+        """Feed retried URLs to the running scheduler, or start a new run for them"""
+        scheduler = self.scheduler
+        if scheduler and not scheduler.is_stopped():
+            scheduler.submit(failed_urls)
+            return
+        self.download_threads = [True]
+        if self.download_mode.get() == "one_by_one":
+            self.run_one_by_one(run_id)
+        else:  # batch mode
+            self.run_batch(run_id)
     
     def check_all_downloads_complete(self):
         """Check if all downloads are complete and retry failed ones"""
@@ -2383,11 +2839,43 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             # No extraction active, close normally
             self.force_close()
     
+    def _remove_temp_files(self, temp_file, worker):
+        """Delete a removed download's .tmp and segment state after its worker has exited"""
+        if worker is not None and worker is not threading.current_thread():
+            worker.join(SHUTDOWN_TIMEOUT)
+            if worker.is_alive():
+                print(f"Worker for {temp_file.name} still running after {SHUTDOWN_TIMEOUT:.0f}s - removing its files anyway")
+        try:
+            if temp_file.exists():
+                temp_file.unlink()
+                print(f"Removed temporary file: {temp_file}")
+            clear_segment_state(temp_file)
+        except Exception as e:
+            print(f"Failed to remove temporary file {temp_file}: {e}")
+
+    def _wait_for_workers(self, timeout):
+        """Wait (bounded) for download workers to finish, keeping Tk responsive for their UI callbacks"""
+        workers = {url: state.get("thread") for url, state in self.download_states.items()
+                   if state.get("thread") is not None and state["thread"].is_alive()}
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and any(t.is_alive() for t in workers.values()):
+            try:
+                self.root.update()
+            except tk.TclError:
+                pass
+            time.sleep(0.05)
+        unfinished = [url for url, t in workers.items() if t.is_alive()]
+        print(f"Shutdown: {len(workers) - len(unfinished)} of {len(workers)} download workers finished")
+        for url in unfinished:
+            print(f"Shutdown: worker for {url} still running after {timeout:.0f}s - abandoning it")
+        return unfinished
+
     def force_close(self):
         """Force close the application with cleanup"""
         try:
-            # Stop all downloads
+            # Stop all downloads - their connections are cut, so workers only have to save state
             self.stop_downloads()
+            self._wait_for_workers(SHUTDOWN_TIMEOUT)
             
             # Cleanup extraction process
             if hasattr(self, 'extractor_tab') and self.extractor_tab:
@@ -2396,6 +2884,11 @@ We remember and honor those who sacrificed their lives for freedom and justice.
             # Stop network monitoring
             self._net_monitor_running = False
             
+            # Drop pooled keep-alive connections and pending link resolutions
+            self.link_resolver.shutdown()
+            page_parser.shutdown()
+            close_session()
+            
             # Stop auto-resume monitoring
             if hasattr(self, 'auto_resume'):
                 self.auto_resume.stop_monitoring()
@@ -2408,6 +2901,8 @@ We remember and honor those who sacrificed their lives for freedom and justice.
 
 
 if __name__ == "__main__":
+    # Needed by the page-parsing process pool in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = DownloaderGUI(root)
     app.root.geometry("1220x980")  # Increased height by 50 pixels (930 + 50 = 980) and width by 70 pixels (1150 + 70 = 1220)  # Larger window size
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+HTTP Session - Shared pooled transport
+One keep-alive session used for page fetching, link resolution, probing and transfers
+so every part reuses warm connections instead of paying a new TCP/TLS handshake
+"""
+
+import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+DEFAULT_POOL_SIZE = 10
+POOL_HEADROOM = 4  # Extra connections for page fetches and link resolution running next to downloads
+
+_session = None
+_pool_size = DEFAULT_POOL_SIZE
+_lock = threading.Lock()
+_stats = {'requests': 0, 'errors': 0}
+_retired_adapters = []  # Adapters replaced by a resize; closed on shutdown so in-flight transfers finish
+
+
+def _make_adapter(pool_size):
+    return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=False)
+
+
+def get_session():
+    """Get the shared session, creating it on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update(DEFAULT_HEADERS)
+            adapter = _make_adapter(_pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def configure_pool(concurrency):
+    """Size the keep-alive pool for `concurrency` simultaneous connections per host"""
+    global _pool_size
+    pool_size = max(DEFAULT_POOL_SIZE, int(concurrency) + POOL_HEADROOM)
+    session = get_session()
+    with _lock:
+        if pool_size == _pool_size:
+            return
+        print(f"HTTP pool resized: {_pool_size} -> {pool_size} connections per host")
+        _pool_size = pool_size
+        for prefix in ("https://", "http://"):
+            _retired_adapters.append(session.adapters[prefix])
+        adapter = _make_adapter(pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+
+def http_get(url, **kwargs):
+    """GET through the shared session"""
+    session = get_session()
+    with _lock:
+        _stats['requests'] += 1
+    try:
+        return session.get(url, **kwargs)
+    except Exception:
+        with _lock:
+            _stats['errors'] += 1
+        raise
+
+
+def drop_connection(response):
+    """Shut down the socket under a streaming response so a read blocked in another thread returns now"""
+    raw = getattr(response, "raw", None)
+    sock = getattr(getattr(raw, "_connection", None), "sock", None)
+    if sock is None:
+        # http.client response -> buffered reader -> SocketIO -> socket
+        sock = getattr(getattr(getattr(getattr(raw, "_fp", None), "fp", None), "raw", None), "_sock", None)
+    if sock is None:
+        return False
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+        return True
+    except OSError:
+        return False
+
+
+def get_pool_stats():
+    """Pool usage counters: requests sent, connections opened and how many requests reused one"""
+    session = get_session()
+    opened = 0
+    pooled_requests = 0
+    pools_open = 0
+    seen = set()
+    with _lock:
+        adapters = list(session.adapters.values()) + list(_retired_adapters)
+    for adapter in adapters:
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            pools_open += 1
+            opened += pool.num_connections
+            pooled_requests += pool.num_requests
+
+    with _lock:
+        return {
+            'requests': _stats['requests'],
+            'errors': _stats['errors'],
+            'pool_size': _pool_size,
+            'pools': pools_open,
+            'connections_opened': opened,
+            'connections_reused': max(0, pooled_requests - opened),
+        }
+
+
+def close_session():
+    """Close every pooled connection (application shutdown)"""
+    global _session
+    with _lock:
+        session = _session
+        _session = None
+        retired = list(_retired_adapters)
+        _retired_adapters.clear()
+    for adapter in retired:
+        try:
+            adapter.close()
+        except Exception:
+            pass
+    if session is not None:
+        session.close()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Link Resolver - Parallel page -> /dl/ link resolution
+Bounded worker pool with a per-host cap; concurrent requests for the same page share one fetch.
+Pages are scanned with precompiled regexes first; BeautifulSoup parsing is the fallback and can
+run in a process pool so many pages are not serialized by the GIL.
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urljoin
+
+from download_scheduler import host_of
+
+RESOLVE_WORKERS = 8
+RESOLVE_PER_HOST = 4  # Page fetches allowed at once against one host
+PARSE_PROCESSES = max(1, min(4, (os.cpu_count() or 1) - 1))  # 1 = parse in the calling thread
+
+# Quoted /dl/ URLs anywhere in the page (absolute, protocol-relative or site-relative)
+RAW_DL_PATTERN = re.compile(r"""["']((?:https?:)?(?://fuckingfast\.co)?/dl/[^"'\s]+)["']""")
+# The same patterns the script scan used to build per tag, compiled once
+SCRIPT_DL_PATTERNS = [
+    re.compile(r"""["']https://fuckingfast\.co/dl/([^"']+)["']"""),
+    re.compile(r"""["']([^"']*fuckingfast\.co/dl/[^"']*)["']"""),
+    re.compile(r"""["'](/dl/[^"']*)["']"""),
+]
+TITLE_PATTERN = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+DEFAULT_METHOD_ORDER = ["raw", "script", "anchor"]
+SOUP_METHODS = {"script", "anchor"}
+
+
+def _absolute_dl(match):
+    """Full fuckingfast URL from a match that is a bare token, a /dl/ path or a full URL"""
+    if "/dl/" in match:
+        return urljoin("https://fuckingfast.co/", match)
+    return f"https://fuckingfast.co/dl/{match}"
+
+
+def _find_raw(html, page_url):
+    """Fast path: one precompiled scan over the raw response text"""
+    m = RAW_DL_PATTERN.search(html)
+    return _absolute_dl(m.group(1)) if m else None
+
+
+def _find_in_scripts(soup, page_url):
+    """Download URL inside a <script> that mentions 'download'"""
+    for script in soup.find_all("script"):
+        if script.string and "download" in script.string.lower():
+            for pattern in SCRIPT_DL_PATTERNS:
+                m = pattern.search(script.string)
+                if m:
+                    return _absolute_dl(m.group(1))
+    return None
+
+
+def _find_in_anchors(soup, page_url):
+    """Any <a> whose href contains /dl/"""
+    link = soup.find("a", href=lambda x: x and "/dl/" in x)
+    return urljoin(page_url, link["href"]) if link else None
+
+
+def parse_download_link(html, page_url, order):
+    """(link, method) using the methods in `order`; the page is only soup-parsed if a soup method is reached"""
+    soup = None
+    for method in order:
+        if method == "raw":
+            link = _find_raw(html, page_url)
+        else:
+            if soup is None:
+                from bs4 import BeautifulSoup
+                soup = BeautifulSoup(html, "html.parser")
+            link = _find_in_scripts(soup, page_url) if method == "script" else _find_in_anchors(soup, page_url)
+        if link:
+            return link, method
+    return None, None
+
+
+class PageParser:
+    def __init__(self, processes=PARSE_PROCESSES):
+        """Runs the resolution methods for a page, best method for its host first"""
+        self.processes = processes
+        self._lock = threading.Lock()
+        self._wins = {}  # {host: {method: successes}}
+        self._pool = None
+
+    def method_order(self, host):
+        """Methods sorted by how often they worked for this host (default order breaks ties)"""
+        with self._lock:
+            wins = dict(self._wins.get(host, {}))
+        return sorted(DEFAULT_METHOD_ORDER, key=lambda m: -wins.get(m, 0))
+
+    def _record(self, host, method):
+        with self._lock:
+            wins = self._wins.setdefault(host, {})
+            wins[method] = wins.get(method, 0) + 1
+
+    def find(self, html, page_url):
+        """(link, method) for a fetched page, or (None, None)"""
+        host = host_of(page_url)
+        order = self.method_order(host)
+        # Cheap regex methods at the front of the order run right here...
+        while order and order[0] not in SOUP_METHODS:
+            link, method = parse_download_link(html, page_url, [order.pop(0)])
+            if link:
+                self._record(host, method)
+                return link, method
+        # ...the rest needs a full parse, which goes to the process pool when there is one
+        link, method = None, None
+        if order:
+            link, method = self._parse(html, page_url, order)
+        if link:
+            self._record(host, method)
+        return link, method
+
+    def _parse(self, html, page_url, order):
+        if self.processes > 1:
+            try:
+                return self._get_pool().submit(parse_download_link, html, page_url, order).result()
+            except Exception as e:
+                print(f"Parse pool unavailable ({e}), parsing in-thread")
+                self.processes = 1
+        return parse_download_link(html, page_url, order)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+page_parser = PageParser()
+
+
+class LinkResolver:
+    def __init__(self, resolve, max_workers=RESOLVE_WORKERS, max_per_host=RESOLVE_PER_HOST):
+        """Run `resolve(page_url)` on a shared pool; returns futures so callers can stream results"""
+        self._resolve = resolve
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="resolve")
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._inflight = {}  # {page_url: Future} - coalesces duplicate requests
+        self._host_slots = {}  # {host: BoundedSemaphore}
+
+    def submit(self, page_url):
+        """Future for the resolved link; joins an in-flight resolution of the same page if there is one"""
+        with self._lock:
+            future = self._inflight.get(page_url)
+            if future is not None:
+                print(f"Coalescing resolution of {page_url}")
+                return future
+            future = self._executor.submit(self._run, page_url)
+            self._inflight[page_url] = future
+        # Outside the lock: the callback runs right away if the future already finished
+        future.add_done_callback(lambda f, u=page_url: self._finished(u, f))
+        return future
+
+    def _slot(self, host):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _run(self, page_url):
+        with self._slot(host_of(page_url)):
+            return self._resolve(page_url)
+
+    def _finished(self, page_url, future):
+        with self._lock:
+            if self._inflight.get(page_url) is future:
+                del self._inflight[page_url]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Metadata Cache - Remembers what each download URL told us (size, filename, ETag, Range support)
+and which /dl/ link each page resolved to; stored next to config.json so restarts can reuse them
+"""
+
+import json
+import os
+import threading
+import time
+
+from config_manager import get_config_path
+
+METADATA_FILE = "remote_metadata.json"
+METADATA_TTL = 12 * 60 * 60  # Seconds before an entry is considered stale and dropped
+LINK_CACHE_FILE = "resolved_links.json"
+LINK_TTL = 6 * 60 * 60  # Resolved /dl/ links are reused for this long
+LINK_CACHE_SIZE = 5000  # Least recently used links beyond this are evicted
+
+
+class PersistentCache:
+    def __init__(self, filename, ttl, max_entries=None):
+        """URL -> dict of fields plus 'fetched' (time recorded), expiring after `ttl` seconds"""
+        self.filename = filename
+        self.ttl = ttl
+        self.max_entries = max_entries  # LRU cap; None = unbounded
+        self._lock = threading.Lock()
+        self._entries = None  # Loaded on first use, kept in least -> most recently used order
+
+    def _path(self):
+        return get_config_path().parent / self.filename
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            with open(self._path(), 'r') as f:
+                self._entries = json.load(f)
+        except Exception:
+            self._entries = {}
+        if self._evict():
+            self._save()
+
+    def _evict(self):
+        """Drop expired entries; returns True if anything was removed"""
+        cutoff = time.time() - self.ttl
+        expired = [url for url, meta in self._entries.items() if meta.get('fetched', 0) < cutoff]
+        for url in expired:
+            del self._entries[url]
+        return bool(expired)
+
+    def _save(self):
+        path = self._path()
+        temp_path = path.with_name(path.name + ".tmp")
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"Failed to save {self.filename}: {e}")
+
+    def get(self, url):
+        """Cached metadata for `url`, or None if unknown or expired"""
+        with self._lock:
+            self._load()
+            meta = self._entries.get(url)
+            if not meta:
+                return None
+            if meta.get('fetched', 0) < time.time() - self.ttl:
+                del self._entries[url]
+                self._save()
+                return None
+            # Mark as most recently used (persisted with the next write)
+            self._entries[url] = self._entries.pop(url)
+            return dict(meta)
+
+    def get_many(self, urls):
+        """{url: metadata} for every URL in `urls` with a fresh entry"""
+        with self._lock:
+            self._load()
+            self._evict()
+            return {url: dict(self._entries[url]) for url in urls if url in self._entries}
+
+    def record(self, url, **fields):
+        """Merge freshly observed fields into the entry for `url` and persist it"""
+        with self._lock:
+            self._load()
+            meta = self._entries.pop(url, {})
+            meta.update({k: v for k, v in fields.items() if v is not None})
+            meta['fetched'] = time.time()
+            self._entries[url] = meta
+            if self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            self._save()
+
+    def forget(self, url):
+        with self._lock:
+            self._load()
+            if self._entries.pop(url, None) is not None:
+                self._save()
+
+
+metadata_cache = PersistentCache(METADATA_FILE, METADATA_TTL)  # {'size', 'filename', 'etag', 'last_modified', 'ranges'}
+resolved_link_cache = PersistentCache(LINK_CACHE_FILE, LINK_TTL, LINK_CACHE_SIZE)  # page URL -> {'link'}
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Progress Aggregator - Coalesced progress reporting for the download list
+Workers overwrite their latest counters without locking; the UI tick renders only rows that changed
+"""
+
+
+class ProgressAggregator:
+    def __init__(self):
+        self._latest = {}  # {url: (downloaded, total)} written by worker threads
+        self._rendered = {}  # {url: (downloaded, total)} last values drawn by the UI tick
+
+    def update(self, url, downloaded, total):
+        """Record the newest counters for a URL (a single dict store, safe from any thread)"""
+        self._latest[url] = (downloaded, total)
+
+    def forget(self, url):
+        """Drop a URL that was removed from the list"""
+        self._latest.pop(url, None)
+        self._rendered.pop(url, None)
+
+    def drain_changed(self):
+        """Return {url: (downloaded, total)} for rows that changed since the last call (UI thread only)"""
+        snapshot = dict(self._latest)
+        changed = {}
+        for url, values in snapshot.items():
+            if self._rendered.get(url) != values:
+                changed[url] = values
+                self._rendered[url] = values
+        return changed
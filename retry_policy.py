@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Retry Policy - Classifies download failures and decides when (and whether) to try again
+Each failure class has its own exponential backoff, jitter and retry cap
+"""
+
+import errno
+import random
+import socket
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# class: (first delay in seconds, max delay in seconds, max retries)
+RETRY_POLICIES = {
+    "dns": (10, 300, 4),  # Name resolution failed - usually the local network is down
+    "connect_timeout": (5, 120, 6),
+    "read_timeout": (2, 60, 8),  # Stalled mid-transfer; the .tmp is resumed so retries are cheap
+    "connection": (2, 60, 8),  # Reset / closed connections
+    "server_error": (5, 300, 6),  # 5xx
+    "rate_limited": (30, 600, 8),  # 429; never sooner than the Retry-After the server sends
+    "disk_full": (0, 0, 0),  # Retrying cannot help until space is freed
+    "client_error": (0, 0, 0),  # Other 4xx - the request itself is wrong
+    "other": (5, 60, 2),
+}
+PERMANENT_CLASSES = {kind for kind, (_, _, limit) in RETRY_POLICIES.items() if limit == 0}
+
+
+def _chain(error):
+    """The exception plus everything it wraps (requests/urllib3 nest the real cause)"""
+    seen = []
+    while error is not None and error not in seen:
+        seen.append(error)
+        nested = error.args[0] if getattr(error, "args", None) else None
+        reason = getattr(error, "reason", None)
+        error = error.__cause__ or error.__context__ or (reason if isinstance(reason, BaseException) else None) \
+            or (nested if isinstance(nested, BaseException) else None)
+    return seen
+
+
+def classify_error(error):
+    """Failure class of a download exception (a key of RETRY_POLICIES)"""
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = getattr(error.response, "status_code", None) or 0
+        if status == 429:
+            return "rate_limited"
+        if status >= 500:
+            return "server_error"
+        return "client_error"
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return "connect_timeout"
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return "read_timeout"
+
+    chain = _chain(error)
+    for e in chain:
+        if isinstance(e, socket.gaierror) or type(e).__name__ == "NameResolutionError":
+            return "dns"
+        if isinstance(e, OSError) and e.errno in (errno.ENOSPC, getattr(errno, "EDQUOT", errno.ENOSPC)):
+            return "disk_full"
+    for e in chain:
+        if isinstance(e, (socket.timeout, TimeoutError)) or type(e).__name__ == "ReadTimeoutError":
+            return "read_timeout"
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                          ConnectionError)):
+        return "connection"
+    if isinstance(error, IOError) and "Connection closed" in str(error):
+        return "connection"
+    return "other"
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the failed response, or None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def backoff_delay(kind, attempt):
+    """Exponential delay for the n-th retry (1-based) with 'equal jitter': half fixed, half random"""
+    base, cap, _ = RETRY_POLICIES[kind]
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryTracker:
+    def __init__(self):
+        """Per-URL retry bookkeeping: attempts, failure class and when the next attempt is due"""
+        self._lock = threading.Lock()
+        self._entries = {}  # {url: {'attempts', 'kind', 'limit', 'next_at', 'error'}}
+
+    def failed(self, url, error):
+        """Record a failure; returns the delay before the next attempt, or None when giving up"""
+        kind = classify_error(error)
+        limit = RETRY_POLICIES[kind][2]
+        with self._lock:
+            entry = self._entries.setdefault(url, {'attempts': 0})
+            entry.update(kind=kind, limit=limit, error=str(error), next_at=None)
+            if entry['attempts'] >= limit:
+                return None
+            entry['attempts'] += 1
+            delay = backoff_delay(kind, entry['attempts'])
+            server_delay = retry_after(error)
+            if server_delay is not None:
+                delay = max(delay, server_delay)
+            entry['next_at'] = time.time() + delay
+            return delay
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            return dict(entry) if entry else None
+
+    def cancel(self, url):
+        """Drop the pending retry time of a URL (nothing is going to run it)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry:
+                entry['next_at'] = None
+
+    def reset(self, url):
+        with self._lock:
+            self._entries.pop(url, None)
+
+    def clear(self):
+        """Forget every URL; returns the URLs that had entries"""
+        with self._lock:
+            urls = list(self._entries)
+            self._entries.clear()
+            return urls
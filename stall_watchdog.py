@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Stall Watchdog - Recycles connections that dribble or freeze
+Every open transfer is sampled over a sliding window; one that stays under a speed floor, or far
+below the other connections, has its socket shut down so its owner resumes on a fresh one via Range
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+
+from http_session import drop_connection
+
+STALL_WINDOW = 20.0  # Seconds a connection must stay slow before it is recycled
+STALL_FLOOR = 8 * 1024  # Bytes/sec; slower counts as stalled (not applied while a speed cap is set)
+STALL_PEER_RATIO = 0.1  # ...or slower than this fraction of the median of the other connections
+STALL_MIN_PEERS = 2  # Peer comparison needs at least this many other measured connections
+STALL_CHECK_INTERVAL = 1.0
+STALL_RECYCLE_LIMIT = 5  # Recycles per transfer slot; after that the normal timeouts and retries apply
+
+
+class Lane:
+    def __init__(self, name, capped=None):
+        """One transfer slot (a segment or a single stream) whose current response is watched"""
+        self.name = name
+        self.capped = capped  # Callable: True while a speed cap legitimately slows this lane
+        self.bytes = 0  # Written by the owning thread only
+        self.recycles = 0
+        self.response = None
+        self.reason = None  # Set by the watchdog when it dropped the connection
+        self._samples = deque()  # (monotonic time, bytes)
+        self._attached = 0.0
+
+    def attach(self, response):
+        """Start watching a (new) response; the window starts over"""
+        self.response = response
+        self.reason = None
+        self._samples.clear()
+        self._attached = time.monotonic()
+
+    def add(self, amount):
+        self.bytes += amount
+
+    def take_recycle(self):
+        """Why the watchdog dropped the connection (and forget it), or None"""
+        reason, self.reason = self.reason, None
+        return reason
+
+    def _rate(self, now):
+        """Bytes/sec over the window, or None until the connection has been watched for a full window"""
+        self._samples.append((now, self.bytes))
+        while len(self._samples) > 1 and now - self._samples[1][0] >= STALL_WINDOW:
+            self._samples.popleft()
+        if now - self._attached < STALL_WINDOW or self.response is None:
+            return None
+        first_ts, first_bytes = self._samples[0]
+        return (self.bytes - first_bytes) / max(now - first_ts, 1e-6)
+
+
+class StallWatchdog:
+    def __init__(self):
+        """One background thread sampling every registered lane"""
+        self._lock = threading.Lock()
+        self._lanes = set()
+        self._thread = None
+        self.recycles = 0
+        self.reasons = {}  # {reason: count}
+
+    def register(self, name, capped=None):
+        lane = Lane(name, capped)
+        with self._lock:
+            self._lanes.add(lane)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        return lane
+
+    def unregister(self, lane):
+        with self._lock:
+            self._lanes.discard(lane)
+        lane.response = None
+
+    def stats(self):
+        with self._lock:
+            return {'recycles': self.recycles, 'reasons': dict(self.reasons)}
+
+    def _loop(self):
+        while True:
+            time.sleep(STALL_CHECK_INTERVAL)
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Stall watchdog error: {e}")
+
+    def check(self):
+        """Sample every lane and recycle the ones that stayed too slow for a whole window"""
+        now = time.monotonic()
+        with self._lock:
+            lanes = list(self._lanes)
+        rates = {}
+        for lane in lanes:
+            rate = lane._rate(now)
+            if rate is not None:
+                rates[lane] = rate
+
+        for lane, rate in rates.items():
+            if lane.reason or lane.recycles >= STALL_RECYCLE_LIMIT:
+                continue
+            peers = [r for other, r in rates.items() if other is not lane]
+            reason = None
+            if not (lane.capped and lane.capped()) and rate < STALL_FLOOR:
+                reason = "below floor"
+            elif len(peers) >= STALL_MIN_PEERS and rate < STALL_PEER_RATIO * statistics.median(peers):
+                reason = "slow vs peers"
+            if reason:
+                self._recycle(lane, rate, reason)
+
+    def _recycle(self, lane, rate, reason):
+        response = lane.response
+        if response is None:
+            return
+        lane.reason = reason
+        lane.recycles += 1
+        with self._lock:
+            self.recycles += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        print(f"Stall watchdog: recycling {lane.name} ({reason}, {rate / 1024:.1f} KB/s over "
+              f"{STALL_WINDOW:.0f}s, recycle {lane.recycles}/{STALL_RECYCLE_LIMIT})")
+        if not drop_connection(response):
+            # No socket to shut down - closing still ends the read at the next chunk
+            try:
+                response.close()
+            except Exception:
+                pass
+
+
+watchdog = StallWatchdog()